@@ -0,0 +1,57 @@
+"""
+Behavioral design patterns. Public classes are resolved lazily on first attribute access (PEP 562),
+so importing the package does not import, or run, any of the pattern modules.
+"""
+
+
+import importlib
+
+_EXPORTS = {
+    "command_method": (
+        "TV", "Stereo", "Light", "Command", "TurnOnCommand", "TurnOffCommand", "MacroCommand",
+        "CommandScheduler", "CommandJournal", "CommandHistory", "RemoteControl",
+    ),
+    "iterator_method": (
+        "Iterator", "ListIterator", "Iterable", "ListIterable", "MappedListIterator",
+        "MappedListIterable",
+    ),
+    "mediator_method": (
+        "ChatMediator", "ChatRoom", "TopicChatRoom", "AsyncChatRoom", "User", "ChatUser",
+        "AsyncChatUser",
+    ),
+    "observer_method": (
+        "Subject", "ObserverRegistry", "WeatherStation", "Dispatcher", "ThreadPoolDispatcher",
+        "AsyncioDispatcher", "Observer", "WeatherDisplay", "Logger",
+    ),
+    "state_method": (
+        "VendingMachineContext", "State", "NoCoinState", "HasCoinState", "SoldState",
+        "StateMachineEngine", "VendingFleet",
+    ),
+    "strategy_method": (
+        "Item", "PaymentStrategy", "CreditCardPayment", "PayPalPayment", "LocalGateway",
+        "GatewayClient", "BulkCheckout", "ShoppingCart", "ArrayShoppingCart",
+    ),
+    "template_method": ("Beverage", "Coffee", "Tea", "StepTimer", "BatchPreparer"),
+    "vending_simulator": ("FleetSimulator",),
+    "visitor_method": (
+        "ShoppingCartVisitor", "ShoppingCartTotalVisitor", "Book", "Electronics", "Clothes",
+        "ColumnarCart", "parallel_accept",
+    ),
+}
+
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
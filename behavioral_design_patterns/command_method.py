@@ -6,6 +6,16 @@ between the sender and receiver of a request.
 """
 
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+
 # Receiver classes
 class TV:
     def turn_on(self):
@@ -36,6 +46,12 @@ class Command:
     def execute(self):
         pass
 
+    def inverse(self):
+        raise NotImplementedError(f"{type(self).__name__} cannot be undone")
+
+    def undo(self):
+        self.inverse().execute()
+
 
 # Concrete Command classes
 class TurnOnCommand(Command):
@@ -45,6 +61,9 @@ class TurnOnCommand(Command):
     def execute(self):
         self.device.turn_on()
 
+    def inverse(self):
+        return TurnOffCommand(self.device)
+
 
 class TurnOffCommand(Command):
     def __init__(self, device):
@@ -53,21 +72,344 @@ class TurnOffCommand(Command):
     def execute(self):
         self.device.turn_off()
 
+    def inverse(self):
+        return TurnOnCommand(self.device)
+
+
+# Composite command: many commands dispatched as one unit, run in order
+class MacroCommand(Command):
+    def __init__(self, commands):
+        self.commands = list(commands)
+
+    def execute(self):
+        for command in self.commands:
+            command.execute()
+
+    def inverse(self):
+        return MacroCommand([command.inverse() for command in reversed(self.commands)])
+
+
+# Commands sharing a receiver share a lane
+def _lane_key(command):
+    if isinstance(command, MacroCommand):
+        return _lane_key(command.commands[0]) if command.commands else id(command)
+    return id(getattr(command, "device", command))
+
+
+# The leaf commands of a command, with nested macros expanded in order
+def _flatten(command):
+    if isinstance(command, MacroCommand):
+        for child in command.commands:
+            yield from _flatten(child)
+    else:
+        yield command
+
+
+# Ids of every receiver a command touches, looking inside nested macros
+def _devices(command):
+    return {_lane_key(leaf) for leaf in _flatten(command)}
+
+
+# Split a macro into one single-device macro per receiver, keeping order;
+# nested macros are flattened first so each leaf lands in its own lane
+def _split_by_device(macro):
+    groups = {}
+    for command in _flatten(macro):
+        groups.setdefault(_lane_key(command), []).append(command)
+    return [MacroCommand(commands) for commands in groups.values()]
+
+
+# Runs queued commands on a thread or process pool. Commands for different
+# receivers run concurrently; commands for the same receiver keep their
+# submission order because each lane has at most one command in flight.
+# A macro spanning several receivers is dispatched as one macro per lane.
+# With a process pool, commands and receivers must be picklable and the
+# receivers' side effects happen in the worker processes.
+class CommandScheduler:
+    def __init__(self, max_workers=4, use_processes=False):
+        pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = pool(max_workers=max_workers)
+        self._lock = threading.Condition()
+        self._lanes = {}
+        self._pending = 0
+        self.executed = 0
+        self.errors = []
+        self.queue_waits = deque(maxlen=10_000)
+        self._started = time.perf_counter()
+
+    def submit(self, command):
+        if isinstance(command, MacroCommand):
+            parts = _split_by_device(command)
+            if len(parts) > 1:
+                for part in parts:
+                    self.submit(part)
+                return
+        key = _lane_key(command)
+        with self._lock:
+            self._pending += 1
+            lane = self._lanes.get(key)
+            if lane is not None:
+                lane.append((command, time.perf_counter()))
+                return
+            self._lanes[key] = deque()
+        self._run(key, command, time.perf_counter())
+
+    def _run(self, key, command, enqueued_at):
+        self.queue_waits.append(time.perf_counter() - enqueued_at)
+        future = self._executor.submit(command.execute)
+        future.add_done_callback(lambda f: self._done(key, f))
+
+    def _done(self, key, future):
+        with self._lock:
+            if future.exception() is not None:
+                self.errors.append(future.exception())
+            self.executed += 1
+            self._pending -= 1
+            lane = self._lanes[key]
+            if not lane:
+                del self._lanes[key]
+                self._lock.notify_all()
+                return
+            command, enqueued_at = lane.popleft()
+        self._run(key, command, enqueued_at)
+
+    def join(self):
+        with self._lock:
+            self._lock.wait_for(lambda: self._pending == 0)
+
+    def shutdown(self):
+        self.join()
+        self._executor.shutdown()
+
+    def throughput(self):
+        return self.executed / (time.perf_counter() - self._started)
+
+    def mean_queue_wait(self):
+        if not self.queue_waits:
+            return 0.0
+        return sum(self.queue_waits) / len(self.queue_waits)
+
+
+# Append-only binary log of executed on/off commands. The file starts with
+# a header holding the sorted device names; after it each record is three
+# bytes: a device id, which indexes those names, and the operation. If the
+# devices differ from the ones in the header when a log is opened, its
+# records are rewritten against the new names, and a device that is no
+# longer given is an error. Records are buffered and written with one
+# fsync per group; once the log holds compact_every records it is
+# rewritten to keep only each device's last operation, which is all
+# replay needs.
+class CommandJournal:
+    MAGIC = b"CJN1"
+    HEADER = struct.Struct("<4sI")
+    RECORD = struct.Struct("<HB")
+    OFF, ON = 0, 1
+
+    def __init__(self, path, devices, group_size=512, compact_every=100_000):
+        self.path = path
+        self.names = sorted(devices)
+        self.devices = [devices[name] for name in self.names]
+        self._ids = {id(device): index for index, device in enumerate(self.devices)}
+        self.group_size = group_size
+        self.compact_every = compact_every
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        names = "\0".join(self.names).encode()
+        self._header = self.HEADER.pack(self.MAGIC, len(names)) + names
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            self._write_log({})
+        else:
+            stored_names, offset = self._read_header()
+            if stored_names != self.names:
+                missing = sorted(set(stored_names) - set(self.names))
+                if missing:
+                    raise ValueError(f"Journal refers to devices that were not given: {missing}")
+                remap = {index: self.names.index(name) for index, name in enumerate(stored_names)}
+                self._write_log({remap[device_id]: op for device_id, op in self._final_states(offset).items()})
+        self._file = open(path, "ab")
+        # A crash can leave a torn record at the tail; drop it so new
+        # records stay aligned
+        size = self._file.tell() - len(self._header)
+        if size % self.RECORD.size:
+            size -= size % self.RECORD.size
+            self._file.truncate(len(self._header) + size)
+            self._file.seek(len(self._header) + size)
+        self._records = size // self.RECORD.size
+
+    # Device names stored in the log and the offset of its first record
+    def _read_header(self):
+        with open(self.path, "rb") as log:
+            fixed = log.read(self.HEADER.size)
+            if len(fixed) < self.HEADER.size:
+                raise ValueError(f"{self.path} is not a command journal")
+            magic, names_size = self.HEADER.unpack(fixed)
+            if magic != self.MAGIC:
+                raise ValueError(f"{self.path} is not a command journal")
+            names = log.read(names_size)
+        return (names.decode().split("\0") if names else []), self.HEADER.size + names_size
+
+    def record(self, command):
+        if isinstance(command, MacroCommand):
+            for child in command.commands:
+                self.record(child)
+            return
+        if isinstance(command, TurnOnCommand):
+            op = self.ON
+        elif isinstance(command, TurnOffCommand):
+            op = self.OFF
+        else:
+            raise ValueError(f"Cannot journal {type(command).__name__}")
+        with self._lock:
+            self._buffer += self.RECORD.pack(self._ids[id(command.device)], op)
+            self._buffered += 1
+            if self._buffered >= self.group_size:
+                self._commit()
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records += self._buffered
+            self._buffer.clear()
+            self._buffered = 0
+        if self._records >= self.compact_every:
+            self._compact()
+
+    def compact(self):
+        with self._lock:
+            self._commit()
+            self._compact()
+
+    def _compact(self):
+        self._file.close()
+        self._write_log(self._final_states())
+        self._file = open(self.path, "ab")
+
+    # Atomically replaces the log with the header and one record per device
+    def _write_log(self, states):
+        records = [self.RECORD.pack(device_id, op) for device_id, op in states.items()]
+        temp_path = self.path + ".compact"
+        with open(temp_path, "wb") as temp:
+            temp.write(self._header)
+            temp.write(b"".join(records))
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.replace(temp_path, self.path)
+        self._records = len(records)
+
+    def _final_states(self, offset=None):
+        offset = len(self._header) if offset is None else offset
+        states = {}
+        if os.path.getsize(self.path) <= offset:
+            return states
+        with open(self.path, "rb") as log, mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            size = (len(view) - offset) - (len(view) - offset) % self.RECORD.size
+            for device_id, op in self.RECORD.iter_unpack(memoryview(view)[offset:offset + size]):
+                states[device_id] = op
+        return states
+
+    def replay(self):
+        # Only the last operation per device changes the outcome
+        self.flush()
+        states = self._final_states()
+        for device_id in states:
+            if device_id >= len(self.devices):
+                raise ValueError(f"Journal refers to unknown device id {device_id}")
+        for device_id, op in states.items():
+            device = self.devices[device_id]
+            if op == self.ON:
+                device.turn_on()
+            else:
+                device.turn_off()
+        return len(states)
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+# Ring-buffer undo/redo history. At most max_entries entries are kept, so
+# memory stays flat however many buttons are pressed; the oldest entries
+# fall off. With coalesce=True consecutive commands on the same single
+# device share one entry: undo restores the state before the first of
+# them and redo reapplies the last. Macros spanning several devices
+# always get an entry of their own.
+class CommandHistory:
+    def __init__(self, max_entries=1000, coalesce=True):
+        self.coalesce = coalesce
+        self._undo = deque(maxlen=max_entries)
+        self._redo = deque(maxlen=max_entries)
+
+    def push(self, command):
+        self._redo.clear()
+        if self.coalesce and self._undo:
+            top = self._undo[-1]
+            devices = _devices(command)
+            if len(devices) == 1 and _devices(top[1]) == devices:
+                top[1] = command
+                return
+        self._undo.append([command, command])
+
+    def undo(self):
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        return entry[0].inverse()
+
+    def redo(self):
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return entry[1]
+
+    def __len__(self):
+        return len(self._undo)
+
 
 # Invoker
 class RemoteControl:
-    def __init__(self):
+    def __init__(self, scheduler=None, journal=None, history=None):
         self.commands = {}
+        self.scheduler = scheduler
+        self.journal = journal
+        self.history = history if history is not None else CommandHistory()
 
     def add_command(self, slot, command):
         self.commands[slot] = command
 
     def press_button(self, slot):
         if slot in self.commands:
-            self.commands[slot].execute()
+            self._dispatch(self.commands[slot])
+            self.history.push(self.commands[slot])
         else:
             print("Invalid slot")
 
+    def undo(self):
+        command = self.history.undo()
+        if command is not None:
+            self._dispatch(command)
+
+    def redo(self):
+        command = self.history.redo()
+        if command is not None:
+            self._dispatch(command)
+
+    def _dispatch(self, command):
+        if self.scheduler is None:
+            command.execute()
+        else:
+            self.scheduler.submit(command)
+        if self.journal is not None:
+            self.journal.record(command)
+
 
 # Client code
 if __name__ == "__main__":
@@ -101,3 +443,30 @@ if __name__ == "__main__":
     remote.press_button(5)  # Turns Light off
     remote.press_button(7)  # Invalid slot
 
+    # Undo and redo the last press
+    remote.undo()  # Turns Light back on
+    remote.redo()  # Turns Light off again
+
+    # Queue the same buttons on a worker pool; each device keeps its order
+    scheduler = CommandScheduler(max_workers=3)
+    queued_remote = RemoteControl(scheduler)
+    queued_remote.add_command(0, MacroCommand([tv_on, stereo_on, light_on]))
+    queued_remote.add_command(1, tv_off)
+    queued_remote.add_command(2, light_off)
+    for slot in (0, 1, 2):
+        queued_remote.press_button(slot)
+    scheduler.shutdown()
+    print(f"Executed {scheduler.executed} commands, "
+          f"mean queue wait {scheduler.mean_queue_wait() * 1000:.2f} ms")
+
+    # Journal button presses, then replay them as a restart would
+    journal_path = os.path.join(tempfile.mkdtemp(), "remote.journal")
+    journal = CommandJournal(journal_path, {"tv": tv, "stereo": stereo, "light": light})
+    journaled_remote = RemoteControl(journal=journal)
+    journaled_remote.add_command(0, tv_on)
+    journaled_remote.add_command(1, light_off)
+    journaled_remote.press_button(0)
+    journaled_remote.press_button(1)
+    journal.close()
+    print("Replaying journal:")
+    CommandJournal(journal_path, {"tv": tv, "stereo": stereo, "light": light}).replay()
@@ -6,7 +6,14 @@ for iterating over different types of collections.
 """
 
 
-# Define the Iterator interface
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+
+# Define the Iterator interface; also usable with for loops and itertools
 class Iterator:
     def __init__(self, collection):
         self.collection = collection
@@ -18,24 +25,49 @@ class Iterator:
     def next(self):
         pass
 
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.has_next():
+            raise StopIteration
+        return self.next()
+
+    def next_batch(self, n):
+        batch = []
+        while len(batch) < n and self.has_next():
+            batch.append(self.next())
+        return batch
+
 # Concrete Iterator implementation for a list
 class ListIterator(Iterator):
     def has_next(self):
         return self.index < len(self.collection)
 
-    def next(self):
-        if self.has_next():
+    # One indexing attempt per element instead of a has_next() call plus len()
+    def __next__(self):
+        try:
             item = self.collection[self.index]
-            self.index += 1
-            return item
-        else:
-            raise StopIteration
+        except IndexError:
+            raise StopIteration from None
+        self.index += 1
+        return item
+
+    next = __next__
+
+    def next_batch(self, n):
+        batch = self.collection[self.index:self.index + n]
+        self.index += len(batch)
+        return batch
 
 # Define the Iterable interface
 class Iterable:
     def create_iterator(self):
         pass
 
+    def __iter__(self):
+        return self.create_iterator()
+
 # Concrete Iterable implementation for a list
 class ListIterable(Iterable):
     def __init__(self):
@@ -47,6 +79,144 @@ class ListIterable(Iterable):
     def create_iterator(self):
         return ListIterator(self.items)
 
+# Read-only memoryview over a whole file; empty if it is missing or empty
+def _map_file(path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return memoryview(b"")
+    with open(path, "rb") as f:
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+# Iterator over a MappedListIterable. Items are zero-copy memoryview slices
+# of the mapped file, and seek() jumps to any record index.
+class MappedListIterator(Iterator):
+    def __init__(self, collection):
+        super().__init__(collection)
+        self._count = len(collection)
+        self._data = _map_file(collection.path)
+        self._offsets = None if collection.record_size else _map_file(collection.index_path)
+
+    def has_next(self):
+        return self.index < self._count
+
+    def next(self):
+        if self.index >= self._count:
+            raise StopIteration
+        item = self.item_at(self.index)
+        self.index += 1
+        return item
+
+    __next__ = next
+
+    def item_at(self, index):
+        record_size = self.collection.record_size
+        if record_size:
+            start = index * record_size
+            return self._data[start:start + record_size]
+        (start,) = MappedListIterable.OFFSET.unpack_from(self._offsets, index * MappedListIterable.OFFSET.size)
+        (length,) = MappedListIterable.LENGTH.unpack_from(self._data, start)
+        start += MappedListIterable.LENGTH.size
+        return self._data[start:start + length]
+
+    def seek(self, index):
+        if not 0 <= index <= self._count:
+            raise IndexError("record index out of range")
+        self.index = index
+
+# Concrete Iterable backed by a file of bytes records, for collections
+# larger than RAM. With record_size set, records are fixed-width;
+# otherwise each record is length-prefixed and a sidecar ".idx" file of
+# offsets provides random access. Appends are buffered until buffer_size
+# bytes accumulate or flush() is called.
+class MappedListIterable(Iterable):
+    LENGTH = struct.Struct("<I")
+    OFFSET = struct.Struct("<Q")
+
+    def __init__(self, path, record_size=None, buffer_size=1 << 20):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.record_size = record_size
+        self.buffer_size = buffer_size
+        self._data = open(path, "ab")
+        self._index = None if record_size else open(self.index_path, "ab")
+        self._size = self._data.tell()
+        if record_size:
+            self._count = self._size // record_size
+        else:
+            self._count = self._index.tell() // self.OFFSET.size
+        self._buffer = bytearray()
+        self._index_buffer = bytearray()
+
+    def add_item(self, item):
+        if self.record_size:
+            if len(item) != self.record_size:
+                raise ValueError(f"Record must be {self.record_size} bytes")
+            self._buffer += item
+            self._size += self.record_size
+        else:
+            self._index_buffer += self.OFFSET.pack(self._size)
+            self._buffer += self.LENGTH.pack(len(item))
+            self._buffer += item
+            self._size += self.LENGTH.size + len(item)
+        self._count += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._data.write(self._buffer)
+        self._data.flush()
+        self._buffer.clear()
+        if self._index is not None:
+            self._index.write(self._index_buffer)
+            self._index.flush()
+            self._index_buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        if self._index is not None:
+            self._index.close()
+
+    def __len__(self):
+        return self._count
+
+    def create_iterator(self):
+        self.flush()
+        return MappedListIterator(self)
+
+# Seconds per element for each way of walking a ListIterable
+def benchmark_iteration(items=10_000_000, batch_size=4096):
+    collection = ListIterable()
+    collection.items = list(range(items))
+    timings = {}
+
+    start = time.perf_counter()
+    for _ in collection.items:
+        pass
+    timings["plain list"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    iterator = collection.create_iterator()
+    while iterator.has_next():
+        iterator.next()
+    timings["has_next/next"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in collection:
+        pass
+    timings["for loop"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    iterator = collection.create_iterator()
+    while True:
+        batch = iterator.next_batch(batch_size)
+        if not batch:
+            break
+        for _ in batch:
+            pass
+    timings["next_batch"] = time.perf_counter() - start
+
+    return {name: elapsed / items for name, elapsed in timings.items()}
+
 # Client code
 if __name__ == "__main__":
     my_list = ListIterable()
@@ -59,3 +229,18 @@ if __name__ == "__main__":
     while iterator.has_next():
         item = iterator.next()
         print(item)
+
+    for item in my_list:
+        print(item)
+
+    for name, per_item in benchmark_iteration(100_000).items():
+        print(f"{name}: {per_item * 1e9:.1f} ns/item")
+
+    records = MappedListIterable(os.path.join(tempfile.mkdtemp(), "records.bin"))
+    for word in (b"alpha", b"beta", b"gamma"):
+        records.add_item(word)
+    mapped = records.create_iterator()
+    mapped.seek(1)
+    for record in mapped:
+        print(bytes(record))
+    records.close()
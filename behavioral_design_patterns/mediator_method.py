@@ -8,6 +8,9 @@ which helps manage and coordinate their interactions.
 
 
 from abc import ABC, abstractmethod
+from collections import deque
+import asyncio
+import time
 
 # Mediator interface
 class ChatMediator(ABC):
@@ -28,6 +31,158 @@ class ChatRoom(ChatMediator):
             if user != sender:
                 user.receive_message(message)
 
+# Concrete Mediator that routes by topic. A send is a single append to the
+# topic's log; fan-out happens in flush(), where every member receives the
+# messages posted since its last flush as one batch. Sending to a topic
+# with no members does nothing. If a member's receive_messages raises, the
+# others still get their batch and the first error is raised afterwards.
+class TopicChatRoom(ChatMediator):
+    DEFAULT_TOPIC = "general"
+
+    def __init__(self, batch_size=256):
+        self.batch_size = batch_size
+        self.topics = {}
+        self._logs = {}
+
+    def add_user(self, user, topic=DEFAULT_TOPIC):
+        if topic not in self.topics:
+            self.topics[topic] = {}
+            self._logs[topic] = []
+        # Members only see messages posted after they join
+        self.topics[topic][user] = len(self._logs[topic])
+
+    def remove_user(self, user, topic=DEFAULT_TOPIC):
+        self.topics.get(topic, {}).pop(user, None)
+
+    def send_message(self, sender, message, topic=DEFAULT_TOPIC):
+        if not self.topics.get(topic):
+            return
+        log = self._logs[topic]
+        log.append((sender, message))
+        if len(log) >= self.batch_size:
+            self.flush(topic)
+
+    def flush(self, topic=None):
+        errors = []
+        for name in [topic] if topic is not None else list(self.topics):
+            members = self.topics.get(name)
+            if members is None:
+                continue
+            log = self._logs[name]
+            batches = {}
+            for user, start in members.items():
+                if start not in batches:
+                    pending = log[start:]
+                    batches[start] = (
+                        [message for _, message in pending],
+                        {sender for sender, _ in pending},
+                        pending,
+                    )
+                messages, senders, pending = batches[start]
+                # Non-senders share one batch list; only senders pay for a filtered copy
+                if user in senders:
+                    messages = [message for sender, message in pending if sender is not user]
+                if messages:
+                    try:
+                        user.receive_messages(messages)
+                    except Exception as error:
+                        errors.append(error)
+            for user in members:
+                members[user] = 0
+            log.clear()
+        if errors:
+            raise errors[0]
+
+# Concrete Mediator for asyncio. Each member gets a bounded inbound queue
+# drained by its own task, so a slow receiver never runs inside the sender's
+# call stack. When a queue is full the overflow policy decides what happens:
+# "drop_oldest" discards the oldest queued message, "block" makes the sender
+# wait, and "disconnect" removes the lagging member from the room. Exceptions
+# raised by receive_message are collected in `errors` and consumption goes on.
+class AsyncChatRoom(ChatMediator):
+    OVERFLOW_POLICIES = ("drop_oldest", "block", "disconnect")
+
+    def __init__(self, queue_size=100, overflow="drop_oldest", latency_samples=10_000):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.dropped = 0
+        self.disconnected = []
+        self.errors = []
+        self.latencies = deque(maxlen=latency_samples)
+        self._inboxes = {}
+        self._consumers = {}
+
+    def add_user(self, user):
+        inbox = asyncio.Queue(maxsize=self.queue_size)
+        self._inboxes[user] = inbox
+        self._consumers[user] = asyncio.create_task(self._consume(user, inbox))
+
+    def remove_user(self, user):
+        inbox = self._inboxes.pop(user, None)
+        consumer = self._consumers.pop(user, None)
+        if consumer is not None:
+            consumer.cancel()
+        if inbox is not None:
+            # Discarding queued messages wakes senders blocked in put() and
+            # anyone waiting in join() on this inbox
+            while not inbox.empty():
+                inbox.get_nowait()
+                inbox.task_done()
+
+    async def send_message(self, sender, message):
+        for user, inbox in list(self._inboxes.items()):
+            if user is sender:
+                continue
+            entry = (message, time.perf_counter())
+            if not inbox.full():
+                inbox.put_nowait(entry)
+            elif self.overflow == "block":
+                await inbox.put(entry)
+                if self._inboxes.get(user) is not inbox:
+                    # The receiver left while we were waiting
+                    inbox.get_nowait()
+                    inbox.task_done()
+            elif self.overflow == "drop_oldest":
+                inbox.get_nowait()
+                inbox.task_done()
+                inbox.put_nowait(entry)
+                self.dropped += 1
+            else:
+                self.disconnected.append(user)
+                self.remove_user(user)
+
+    async def _consume(self, user, inbox):
+        while True:
+            message, enqueued_at = await inbox.get()
+            try:
+                await user.receive_message(message)
+            except Exception as error:
+                self.errors.append(error)
+            finally:
+                self.latencies.append(time.perf_counter() - enqueued_at)
+                inbox.task_done()
+
+    def queue_depths(self):
+        return {user.name: inbox.qsize() for user, inbox in self._inboxes.items()}
+
+    def latency_percentile(self, percentile):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    async def join(self):
+        for inbox in list(self._inboxes.values()):
+            await inbox.join()
+
+    async def close(self):
+        consumers = list(self._consumers.values())
+        for user in list(self._inboxes):
+            self.remove_user(user)
+        await asyncio.gather(*consumers, return_exceptions=True)
+
 # Colleague interface
 class User(ABC):
     def __init__(self, name, mediator):
@@ -42,6 +197,10 @@ class User(ABC):
     def receive_message(self, message):
         pass
 
+    def receive_messages(self, messages):
+        for message in messages:
+            self.receive_message(message)
+
 # Concrete Colleague
 class ChatUser(User):
     def send(self, message):
@@ -51,6 +210,48 @@ class ChatUser(User):
     def receive_message(self, message):
         print(f"{self.name} receives: {message}")
 
+# Concrete Colleague for AsyncChatRoom
+class AsyncChatUser(User):
+    def __init__(self, name, mediator, delay=0.0):
+        super().__init__(name, mediator)
+        self.delay = delay
+
+    async def send(self, message):
+        print(f"{self.name} sends: {message}")
+        await self.mediator.send_message(self, message)
+
+    async def receive_message(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        print(f"{self.name} receives: {message}")
+
+# Colleague that only counts deliveries, used for benchmarking
+class SilentChatUser(User):
+    def __init__(self, name, mediator):
+        super().__init__(name, mediator)
+        self.received = 0
+
+    def send(self, message):
+        self.mediator.send_message(self, message)
+
+    def receive_message(self, message):
+        self.received += 1
+
+    def receive_messages(self, messages):
+        self.received += len(messages)
+
+# Messages/sec for a broadcast room of user_count members
+def benchmark_messages_per_second(room, user_count=100_000, messages=50):
+    users = [SilentChatUser(f"user{i}", room) for i in range(user_count)]
+    for user in users:
+        room.add_user(user)
+    start = time.perf_counter()
+    for i in range(messages):
+        users[i % user_count].send(f"message {i}")
+    if isinstance(room, TopicChatRoom):
+        room.flush()
+    return messages / (time.perf_counter() - start)
+
 if __name__ == "__main__":
     chat_room = ChatRoom()
 
@@ -66,6 +267,34 @@ if __name__ == "__main__":
     user2.send("Hi, Alice!")
     user3.send("Hey, Bob!")
 
+    topic_room = TopicChatRoom()
+    dave = ChatUser("Dave", topic_room)
+    erin = ChatUser("Erin", topic_room)
+    topic_room.add_user(dave, "python")
+    topic_room.add_user(erin, "python")
+    topic_room.send_message(dave, "Anyone tried 3.12?", "python")
+    topic_room.flush()
+
+    async def async_chat():
+        room = AsyncChatRoom(queue_size=2, overflow="drop_oldest")
+        fast = AsyncChatUser("Frank", room)
+        slow = AsyncChatUser("Grace", room, delay=0.05)
+        sender = AsyncChatUser("Heidi", room)
+        for user in (fast, slow, sender):
+            room.add_user(user)
+        for i in range(5):
+            await sender.send(f"Update {i}")
+        print("Queue depths:", room.queue_depths())
+        await room.join()
+        print(f"Dropped: {room.dropped}, p99 latency: {room.latency_percentile(99) * 1000:.1f} ms")
+        await room.close()
+
+    asyncio.run(async_chat())
+
+    list_rate = benchmark_messages_per_second(ChatRoom())
+    topic_rate = benchmark_messages_per_second(TopicChatRoom())
+    print(f"100k users: ChatRoom {list_rate:.0f} msg/s, TopicChatRoom {topic_rate:.0f} msg/s")
+
 # Output:
 # Alice sends: Hello, everyone!
 # Bob receives: Hello, everyone!
@@ -7,6 +7,11 @@ to maintain consistency between related objects.
 
 
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import weakref
 
 # Define the Subject interface (Observable)
 class Subject(ABC):
@@ -22,28 +27,184 @@ class Subject(ABC):
     def notify(self):
         pass
 
+# Insertion-ordered set of weakly referenced observers with O(1) add/discard.
+# Garbage-collected observers drop out on their own, so the registry never
+# keeps an observer alive: callers must hold a reference to it themselves.
+class ObserverRegistry:
+    def __init__(self):
+        self._refs = {}
+
+    def add(self, observer):
+        key = id(observer)
+        if key not in self._refs:
+            self._refs[key] = weakref.ref(observer, self._make_reaper(key))
+
+    def discard(self, observer):
+        ref = self._refs.get(id(observer))
+        if ref is not None and ref() is observer:
+            del self._refs[id(observer)]
+
+    def _make_reaper(self, key):
+        refs = self._refs
+
+        def reap(ref):
+            if refs.get(key) is ref:
+                del refs[key]
+        return reap
+
+    def snapshot(self):
+        # Observers may attach/detach while a broadcast walks this list
+        observers = []
+        for ref in list(self._refs.values()):
+            observer = ref()
+            if observer is not None:
+                observers.append(observer)
+        return observers
+
+    def __contains__(self, observer):
+        ref = self._refs.get(id(observer))
+        return ref is not None and ref() is observer
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+
 # Concrete implementation of the Subject
 class WeatherStation(Subject):
-    def __init__(self):
-        self._observers = []
+    def __init__(self, dispatcher=None):
+        self._observers = ObserverRegistry()
         self._temperature = None
+        self._dispatcher = dispatcher
 
+    # Observers are held weakly; one nobody else references is dropped at once
     def attach(self, observer):
-        if observer not in self._observers:
-            self._observers.append(observer)
+        self._observers.add(observer)
 
     def detach(self, observer):
-        self._observers.remove(observer)
+        self._observers.discard(observer)
 
     def notify(self):
-        for observer in self._observers:
-            observer.update(self._temperature)
+        if self._dispatcher is None:
+            for observer in self._observers.snapshot():
+                observer.update(self._temperature)
+        else:
+            self._dispatcher.dispatch(self._observers, self._temperature)
 
     def set_temperature(self, temperature):
         print("Setting temperature to", temperature)
         self._temperature = temperature
         self.notify()
 
+# Bounded queue drained by at most one scheduled task at a time
+class _Mailbox:
+    def __init__(self, queue_size, coalesce):
+        self.lock = threading.Lock()
+        self.pending = deque(maxlen=1 if coalesce else queue_size)
+        self.scheduled = False
+
+
+# Dispatcher interface: hands updates to observers off the producer's thread.
+# The producer only queues one broadcast per reading; a worker then splits
+# the observers into a fixed number of shards, each with its own mailbox
+# drained in order, so every observer still sees readings in order. A full
+# mailbox drops its oldest entry; with coalesce=True only the latest value
+# is kept, so a slow shard skips straight to the newest reading.
+class Dispatcher(ABC):
+    def __init__(self, shards=8, queue_size=1024, coalesce=False):
+        self.queue_size = queue_size
+        self.coalesce = coalesce
+        self.dropped = 0
+        self.errors = []
+        self._broadcasts = _Mailbox(queue_size, coalesce)
+        self._shards = [_Mailbox(queue_size, coalesce) for _ in range(shards)]
+        self._idle = threading.Condition()
+        self._active = 0
+
+    def dispatch(self, observers, value):
+        self._post(self._broadcasts, self._fan_out, (observers, value))
+
+    def _post(self, mailbox, handler, item):
+        with mailbox.lock:
+            if len(mailbox.pending) == mailbox.pending.maxlen:
+                self.dropped += 1
+            mailbox.pending.append(item)
+            if mailbox.scheduled:
+                return
+            mailbox.scheduled = True
+        with self._idle:
+            self._active += 1
+        self._schedule(self._drain, mailbox, handler)
+
+    def _drain(self, mailbox, handler):
+        while True:
+            with mailbox.lock:
+                if not mailbox.pending:
+                    mailbox.scheduled = False
+                    break
+                item = mailbox.pending.popleft()
+            handler(*item)
+        with self._idle:
+            self._active -= 1
+            if not self._active:
+                self._idle.notify_all()
+
+    # Blocks until every queued update has been delivered
+    def join(self):
+        with self._idle:
+            self._idle.wait_for(lambda: not self._active)
+
+    # Observers are taken from the registry here, not by the producer, and
+    # keep their shard for life so their deliveries stay ordered
+    def _fan_out(self, observers, value):
+        groups = [[] for _ in self._shards]
+        for observer in observers:
+            groups[(id(observer) >> 4) % len(groups)].append(observer)
+        for mailbox, group in zip(self._shards, groups):
+            if group:
+                self._post(mailbox, self._deliver, (group, value))
+
+    def _deliver(self, observers, value):
+        for observer in observers:
+            # A failing observer must not stop deliveries to the others
+            try:
+                observer.update(value)
+            except Exception as error:
+                self.errors.append(error)
+
+    @abstractmethod
+    def _schedule(self, fn, *args):
+        pass
+
+
+# Delivers updates from a thread pool
+class ThreadPoolDispatcher(Dispatcher):
+    def __init__(self, max_workers=None, shards=8, queue_size=1024, coalesce=False):
+        super().__init__(shards, queue_size, coalesce)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _schedule(self, fn, *args):
+        self._executor.submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        # Fan-out tasks submit deliveries, so drain before closing the pool
+        if wait:
+            self.join()
+        self._executor.shutdown(wait=wait)
+
+
+# Delivers updates as callbacks on an asyncio event loop; safe to call from any thread
+class AsyncioDispatcher(Dispatcher):
+    def __init__(self, loop, shards=8, queue_size=1024, coalesce=False):
+        super().__init__(shards, queue_size, coalesce)
+        self._loop = loop
+
+    def _schedule(self, fn, *args):
+        self._loop.call_soon_threadsafe(fn, *args)
+
+
 # Define the Observer interface
 class Observer(ABC):
     @abstractmethod
@@ -67,6 +228,25 @@ class Logger(Observer):
     def update(self, temperature):
         print("Logger: Temperature updated to {} degrees".format(temperature))
 
+# Observer that does nothing, used to measure dispatch overhead alone
+class NullObserver(Observer):
+    def update(self, temperature):
+        pass
+
+
+# Average time the producer spends in notify() per reading
+def measure_notify_latency(observer_count=10_000, readings=20, dispatcher=None):
+    station = WeatherStation(dispatcher)
+    observers = [NullObserver() for _ in range(observer_count)]
+    for observer in observers:
+        station.attach(observer)
+    start = time.perf_counter()
+    for reading in range(readings):
+        station._temperature = reading
+        station.notify()
+    return (time.perf_counter() - start) / readings
+
+
 # Example usage
 if __name__ == "__main__":
     weather_station = WeatherStation()
@@ -83,3 +263,19 @@ if __name__ == "__main__":
     weather_station.detach(logger_observer)
 
     weather_station.set_temperature(28)
+
+    # Slow observers no longer stall the producer
+    dispatcher = ThreadPoolDispatcher(max_workers=4, coalesce=True)
+    buffered_station = WeatherStation(dispatcher)
+    buffered_display = WeatherDisplay()
+    buffered_station.attach(buffered_display)
+    for temperature in (21, 22, 23):
+        buffered_station.set_temperature(temperature)
+    dispatcher.shutdown()
+
+    sync_latency = measure_notify_latency()
+    pool = ThreadPoolDispatcher(coalesce=True)
+    pooled_latency = measure_notify_latency(dispatcher=pool)
+    pool.shutdown()
+    print("notify() with 10k observers: sync {:.2f} ms, thread pool {:.2f} ms".format(
+        sync_latency * 1000, pooled_latency * 1000))
@@ -7,26 +7,45 @@ that exhibit different behaviors based on their internal state.
 """
 
 
+from array import array
+import contextlib
+import io
+import time
+
+
 # Define the VendingMachineContext class, which maintains the current state.
+# A handler returns the next state, or None to stay in the current one.
 class VendingMachineContext:
     def __init__(self):
         self.state = NoCoinState()
 
     def insert_coin(self):
-        self.state.insert_coin()
+        self._transition(self.state.insert_coin())
 
     def eject_coin(self):
-        self.state.eject_coin()
+        self._transition(self.state.eject_coin())
 
     def select_item(self):
-        self.state.select_item()
+        self._transition(self.state.select_item())
+
+    def _transition(self, state):
+        if state is not None:
+            self.change_state(state)
 
     def change_state(self, state):
         self.state = state
 
 
-# Define the base State class.
+# Define the base State class. States hold no data, so each class has a
+# single shared instance and transitions allocate nothing.
 class State:
+    _instance = None
+
+    def __new__(cls):
+        if cls.__dict__.get("_instance") is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
     def insert_coin(self):
         pass
 
@@ -60,6 +79,59 @@ class SoldState(State):
         return NoCoinState()
 
 
+# Compiles State subclasses into an integer transition table by probing
+# each handler once (their output is discarded). State and event ids are
+# positions in the states and events sequences.
+class StateMachineEngine:
+    EVENTS = ("insert_coin", "eject_coin", "select_item")
+
+    def __init__(self, states=None, events=EVENTS, initial=None):
+        self.states = list(states or (NoCoinState, HasCoinState, SoldState))
+        self.events = tuple(events)
+        self.initial = self.states.index(initial or self.states[0])
+        self._state_ids = {state: index for index, state in enumerate(self.states)}
+        self._event_ids = {event: index for index, event in enumerate(self.events)}
+        self.table = self._compile()
+
+    def _compile(self):
+        table = array("B")
+        with contextlib.redirect_stdout(io.StringIO()):
+            for state_id, state in enumerate(self.states):
+                for event in self.events:
+                    next_state = getattr(state(), event)()
+                    table.append(state_id if next_state is None else self._state_ids[type(next_state)])
+        return table
+
+    def event_id(self, event):
+        return self._event_ids[event]
+
+    def state_of(self, state_id):
+        return self.states[state_id]
+
+    def step(self, state_id, event_id):
+        return self.table[state_id * len(self.events) + event_id]
+
+
+# A fleet of machines stored as one byte of state id per machine
+class VendingFleet:
+    def __init__(self, engine, size):
+        self.engine = engine
+        self.states = array("B", [engine.initial]) * size
+
+    def apply(self, machine_id, event):
+        self.states[machine_id] = self.engine.step(self.states[machine_id], self.engine.event_id(event))
+
+    def apply_events(self, machine_ids, events):
+        table = self.engine.table
+        width = len(self.engine.events)
+        states = self.states
+        for machine_id, event_id in zip(machine_ids, events):
+            states[machine_id] = table[states[machine_id] * width + event_id]
+
+    def state_of(self, machine_id):
+        return self.engine.state_of(self.states[machine_id])
+
+
 # Usage example
 if __name__ == "__main__":
     vending_machine = VendingMachineContext()
@@ -72,3 +144,12 @@ if __name__ == "__main__":
 
     vending_machine.insert_coin()
     vending_machine.select_item()
+
+    engine = StateMachineEngine()
+    fleet = VendingFleet(engine, 100_000)
+    machine_ids = array("I", (i * 7919 % 100_000 for i in range(3_000_000)))
+    events = array("B", (i % 3 for i in range(3_000_000)))
+    start = time.perf_counter()
+    fleet.apply_events(machine_ids, events)
+    elapsed = time.perf_counter() - start
+    print(f"{len(events) / elapsed:,.0f} transitions/sec across {len(fleet.states)} machines")
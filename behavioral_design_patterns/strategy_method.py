@@ -7,17 +7,45 @@ the specific implementation of an algorithm.
 """
 
 
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import math
+import operator
+import queue
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 # Define the Item
 class Item:
-    def __init__(self, name, price):
+    def __init__(self, name, price, quantity=1):
         self.name = name
         self.price = price
+        self.quantity = quantity
 
-# Define the PaymentStrategy interface
+# Define the PaymentStrategy interface. to_charge() describes a payment
+# for a gateway; pay_batch() is the bulk hook, sending one request per
+# charge unless a strategy can put many charges in one request.
 class PaymentStrategy:
     def pay(self, amount):
         pass
 
+    def to_charge(self, amount):
+        return (type(self).__name__, None, amount)
+
+    @classmethod
+    def pay_batch(cls, client, payments):
+        receipts = []
+        for strategy, amount in payments:
+            receipts.extend(client.submit([strategy.to_charge(amount)]))
+        return receipts
+
 # Concrete PaymentStrategy implementations
 class CreditCardPayment(PaymentStrategy):
     def __init__(self, card_number, card_holder):
@@ -27,6 +55,13 @@ class CreditCardPayment(PaymentStrategy):
     def pay(self, amount):
         print(f"Paid ${amount} with Credit Card: {self.card_number}")
 
+    def to_charge(self, amount):
+        return ("credit_card", self.card_number, amount)
+
+    @classmethod
+    def pay_batch(cls, client, payments):
+        return client.submit([strategy.to_charge(amount) for strategy, amount in payments])
+
 class PayPalPayment(PaymentStrategy):
     def __init__(self, email):
         self.email = email
@@ -34,21 +69,223 @@ class PayPalPayment(PaymentStrategy):
     def pay(self, amount):
         print(f"Paid ${amount} with PayPal: {self.email}")
 
-# Context class that uses the PaymentStrategy
+    def to_charge(self, amount):
+        return ("paypal", self.email, amount)
+
+    @classmethod
+    def pay_batch(cls, client, payments):
+        return client.submit([strategy.to_charge(amount) for strategy, amount in payments])
+
+# Local stand-in for a payment gateway, used by tests and benchmarks.
+# Opening a connection costs connect_latency; each request costs latency
+# however many charges it carries.
+class LocalGateway:
+    def __init__(self, latency=0.005, connect_latency=0.02):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.requests = 0
+        self._receipt_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def connect(self):
+        time.sleep(self.connect_latency)
+        with self._lock:
+            self.connections += 1
+        return GatewayConnection(self)
+
+    def handle(self, charges):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            return [(next(self._receipt_ids), charge) for charge in charges]
+
+class GatewayConnection:
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def send(self, charges):
+        return self.gateway.handle(charges)
+
+# Thread-safe client keeping up to max_connections open connections for reuse
+class GatewayClient:
+    def __init__(self, gateway, max_connections=8):
+        self.gateway = gateway
+        self.max_connections = max_connections
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.max_connections
+            if can_open:
+                self._opened += 1
+        if can_open:
+            return self.gateway.connect()
+        return self._idle.get()
+
+    def submit(self, charges):
+        connection = self._acquire()
+        try:
+            return connection.send(charges)
+        finally:
+            self._idle.put(connection)
+
+# Settles many carts at once: orders are grouped by strategy class, split
+# into batches of batch_size and paid concurrently through pay_batch().
+class BulkCheckout:
+    def __init__(self, client, max_workers=8, batch_size=100):
+        self.client = client
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+
+    def checkout_many(self, orders):
+        groups = {}
+        for index, (cart, strategy) in enumerate(orders):
+            groups.setdefault(type(strategy), []).append((index, strategy, cart.calculate_total()))
+        receipts = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            for strategy_class, payments in groups.items():
+                for start in range(0, len(payments), self.batch_size):
+                    batch = payments[start:start + self.batch_size]
+                    future = executor.submit(
+                        strategy_class.pay_batch, self.client,
+                        [(strategy, amount) for _, strategy, amount in batch])
+                    futures.append((batch, future))
+            for batch, future in futures:
+                for (index, _, _), receipt in zip(batch, future.result()):
+                    receipts[index] = receipt
+        return [receipts[index] for index in range(len(receipts))]
+
+# Context class that uses the PaymentStrategy. The total is kept up to date
+# on add/remove, so price queries are O(1); call recalculate_total() after
+# changing an item's price in place.
 class ShoppingCart:
     def __init__(self):
         self.cart = []
+        self.total = 0.0
 
     def add_item(self, item):
         self.cart.append(item)
+        self.total += item.price * item.quantity
+
+    def remove_item(self, item):
+        self.cart.remove(item)
+        self.total -= item.price * item.quantity
 
     def calculate_total(self):
-        return sum(item.price for item in self.cart)
+        return self.total
+
+    def recalculate_total(self):
+        self.total = math.fsum(item.price * item.quantity for item in self.cart)
+        return self.total
 
     def checkout(self, payment_strategy):
         total_amount = self.calculate_total()
         payment_strategy.pay(total_amount)
 
+# ShoppingCart storing prices and quantities in array('d') columns instead
+# of Item objects. Bulk totals, discounts and currency conversion work on
+# whole columns, through NumPy views when NumPy is installed.
+class ArrayShoppingCart(ShoppingCart):
+    def __init__(self):
+        self.names = []
+        self.prices = array("d")
+        self.quantities = array("d")
+        self.total = 0.0
+
+    def add_item(self, item):
+        self.names.append(item.name)
+        self.prices.append(item.price)
+        self.quantities.append(item.quantity)
+        self.total += item.price * item.quantity
+
+    def remove_item(self, item):
+        index = self.names.index(item.name)
+        self.total -= self.prices[index] * self.quantities[index]
+        del self.names[index]
+        del self.prices[index]
+        del self.quantities[index]
+
+    def items(self):
+        for name, price, quantity in zip(self.names, self.prices, self.quantities):
+            yield Item(name, price, quantity)
+
+    def recalculate_total(self):
+        if numpy is not None and self.prices:
+            self.total = float(numpy.dot(numpy.frombuffer(self.prices), numpy.frombuffer(self.quantities)))
+        else:
+            self.total = math.fsum(map(operator.mul, self.prices, self.quantities))
+        return self.total
+
+    def _scale_prices(self, factor):
+        if numpy is not None and self.prices:
+            numpy.frombuffer(self.prices)[:] *= factor
+        else:
+            self.prices = array("d", [price * factor for price in self.prices])
+        self.total *= factor
+
+    def apply_discount(self, rate):
+        self._scale_prices(1.0 - rate)
+
+    def convert_currency(self, exchange_rate):
+        self._scale_prices(exchange_rate)
+
+# Seconds per total query for a full rescan, the running total and a
+# columnar recalculation
+def benchmark_totals(items=1_000_000):
+    cart = ShoppingCart()
+    array_cart = ArrayShoppingCart()
+    for i in range(items):
+        item = Item(f"Item {i}", float(i % 100))
+        cart.add_item(item)
+        array_cart.add_item(item)
+    timings = {}
+
+    start = time.perf_counter()
+    sum(item.price * item.quantity for item in cart.cart)
+    timings["rescan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cart.calculate_total()
+    timings["running total"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    array_cart.recalculate_total()
+    timings["array recalculation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    array_cart.apply_discount(0.1)
+    timings["array discount"] = time.perf_counter() - start
+    return timings
+
+# Seconds to settle carts one request at a time versus through BulkCheckout
+def benchmark_bulk_checkout(carts=2_000, latency=0.001):
+    orders = []
+    for i in range(carts):
+        cart = ShoppingCart()
+        cart.add_item(Item(f"Item {i}", 10.0))
+        strategy = CreditCardPayment(f"card-{i}", "John Doe") if i % 2 else PayPalPayment(f"user{i}@example.com")
+        orders.append((cart, strategy))
+
+    client = GatewayClient(LocalGateway(latency=latency))
+    start = time.perf_counter()
+    for cart, strategy in orders:
+        client.submit([strategy.to_charge(cart.calculate_total())])
+    sequential = time.perf_counter() - start
+
+    bulk_client = GatewayClient(LocalGateway(latency=latency))
+    start = time.perf_counter()
+    BulkCheckout(bulk_client).checkout_many(orders)
+    bulk = time.perf_counter() - start
+    return {"sequential": sequential, "bulk": bulk}
+
 # Client code
 if __name__ == "__main__":
     cart = ShoppingCart()
@@ -61,3 +298,9 @@ if __name__ == "__main__":
     # payment_strategy = PayPalPayment("john@example.com")
 
     cart.checkout(payment_strategy)
+
+    for name, elapsed in benchmark_totals().items():
+        print(f"{name}: {elapsed * 1000:.3f} ms")
+
+    for name, elapsed in benchmark_bulk_checkout().items():
+        print(f"{name} settlement of 2000 carts: {elapsed:.3f} s")
@@ -6,15 +6,44 @@ subclasses to implement or customize some of those steps.
 """
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 
-# Abstract class defining the template for making a beverage
+# Abstract class defining the template for making a beverage. `steps` maps
+# each step to the steps it depends on; subclasses may override it.
+# Steps in `shared_steps` only need to run once for a whole batch.
 class Beverage(ABC):
+    steps = {
+        "boil_water": (),
+        "brew": ("boil_water",),
+        "pour_in_cup": ("brew",),
+        "add_condiments": ("pour_in_cup",),
+    }
+    shared_steps = ("boil_water",)
 
-    def prepare(self):
-        self.boil_water()
-        self.brew()
-        self.pour_in_cup()
-        self.add_condiments()
+    def prepare(self, hooks=()):
+        for step in self.step_order():
+            _run_step(self, step, hooks)
+
+    @classmethod
+    def step_order(cls):
+        order = []
+        visiting = set()
+
+        def visit(step):
+            if step in order:
+                return
+            if step in visiting:
+                raise ValueError(f"Circular step dependency at {step}")
+            visiting.add(step)
+            for dependency in cls.steps[step]:
+                visit(dependency)
+            order.append(step)
+
+        for step in cls.steps:
+            visit(step)
+        return order
     
     @abstractmethod
     def brew(self):
@@ -30,6 +59,113 @@ class Beverage(ABC):
     def pour_in_cup(self):
         print("Pouring into cup")
 
+def _run_step(beverage, step, hooks):
+    start = time.perf_counter()
+    getattr(beverage, step)()
+    elapsed = time.perf_counter() - start
+    for hook in hooks:
+        hook(beverage, step, elapsed)
+
+# Instrumentation hook collecting latency per step
+class StepTimer:
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self.maxima = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, beverage, step, elapsed):
+        with self._lock:
+            self.totals[step] = self.totals.get(step, 0.0) + elapsed
+            self.counts[step] = self.counts.get(step, 0) + 1
+            self.maxima[step] = max(self.maxima.get(step, 0.0), elapsed)
+
+    def report(self):
+        return {
+            step: {"calls": self.counts[step], "mean": self.totals[step] / self.counts[step], "max": self.maxima[step]}
+            for step in self.totals
+        }
+
+# Prepares a batch of beverages as a pipeline. Shared steps run once per
+# batch on its first beverage that declares them; every other step is
+# submitted to a thread pool as soon as its dependencies have finished, so
+# different beverages are at different stages at the same time. When a
+# step fails, the steps depending on it are skipped for that beverage and
+# the first error is raised once the rest of the batch has finished.
+class BatchPreparer:
+    def __init__(self, max_workers=4, hooks=()):
+        self.max_workers = max_workers
+        self.hooks = list(hooks)
+
+    def prepare_batch(self, beverages):
+        done_shared = set()
+        for beverage in beverages:
+            for step in beverage.step_order():
+                if step in beverage.shared_steps and step not in done_shared:
+                    _run_step(beverage, step, self.hooks)
+                    done_shared.add(step)
+
+        plans = []
+        for beverage in beverages:
+            own_steps = [step for step in beverage.step_order() if step not in beverage.shared_steps]
+            waiting = {}
+            dependents = {}
+            for step in own_steps:
+                dependencies = [d for d in beverage.steps[step] if d not in beverage.shared_steps]
+                waiting[step] = len(dependencies)
+                for dependency in dependencies:
+                    dependents.setdefault(dependency, []).append(step)
+            plans.append((beverage, own_steps, waiting, dependents, set()))
+
+        remaining = [sum(len(own_steps) for _, own_steps, _, _, _ in plans)]
+        if not remaining[0]:
+            return
+        finished = threading.Event()
+        lock = threading.Lock()
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def run(beverage, step, waiting, dependents, skipped):
+                try:
+                    _run_step(beverage, step, self.hooks)
+                    failed = False
+                except Exception as error:
+                    errors.append(error)
+                    failed = True
+                ready = []
+                with lock:
+                    if failed:
+                        # Nothing downstream of a failed step can become
+                        # ready, so count it all as done without running it
+                        stack = list(dependents.get(step, ()))
+                        while stack:
+                            dependent = stack.pop()
+                            if dependent not in skipped:
+                                skipped.add(dependent)
+                                stack.extend(dependents.get(dependent, ()))
+                                remaining[0] -= 1
+                    else:
+                        for dependent in dependents.get(step, ()):
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0:
+                                ready.append(dependent)
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        finished.set()
+                for dependent in ready:
+                    executor.submit(run, beverage, dependent, waiting, dependents, skipped)
+
+            # Collect the initial steps first: running ones may already be
+            # releasing their dependents while we submit
+            initial = [(beverage, step, waiting, dependents, skipped)
+                       for beverage, own_steps, waiting, dependents, skipped in plans
+                       for step in own_steps if waiting[step] == 0]
+            for args in initial:
+                executor.submit(run, *args)
+            finished.wait()
+        if errors:
+            raise errors[0]
+
 # Concrete class for making Coffee
 class Coffee(Beverage):
 
@@ -56,3 +192,9 @@ if __name__ == "__main__":
     print("\nMaking Tea:")
     tea = Tea()
     tea.prepare()
+
+    print("\nMaking a batch of orders:")
+    timer = StepTimer()
+    BatchPreparer(hooks=[timer]).prepare_batch([Coffee(), Tea(), Coffee()])
+    for step, stats in timer.report().items():
+        print(f"{step}: {stats['calls']} calls, mean {stats['mean'] * 1e6:.1f} us")
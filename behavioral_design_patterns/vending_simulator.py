@@ -0,0 +1,157 @@
+"""
+Event-sourced simulator for a fleet of vending machines built on the State pattern.
+Event logs of coins, ejects and selections are generated or loaded, streamed in batches
+through the compiled state machines, and measured. Periodic snapshots let a long run resume
+where it stopped. Run it as a module from the repository root to get the regression benchmark:
+
+    python -m behavioral_design_patterns.vending_simulator
+"""
+
+
+from array import array
+import contextlib
+import io
+import itertools
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from behavioral_design_patterns.state_method import StateMachineEngine, VendingFleet, VendingMachineContext
+
+
+EVENT_RECORD = struct.Struct("<IB")
+SNAPSHOT_HEADER = struct.Struct("<QI")
+
+
+# Random events for a fleet; insert_coin, eject_coin and select_item weighted by `weights`
+def generate_events(machines, count, weights=(5, 1, 4), seed=0):
+    rng = random.Random(seed)
+    event_ids = range(len(weights))
+    for _ in range(count):
+        yield rng.randrange(machines), rng.choices(event_ids, weights)[0]
+
+
+def write_event_log(path, events):
+    with open(path, "wb") as log:
+        for chunk in batched(events, 65_536):
+            log.write(b"".join(EVENT_RECORD.pack(machine_id, event_id) for machine_id, event_id in zip(*chunk)))
+
+
+def read_event_log(path, chunk_records=65_536):
+    with open(path, "rb") as log:
+        while True:
+            data = log.read(chunk_records * EVENT_RECORD.size)
+            if not data:
+                return
+            yield from EVENT_RECORD.iter_unpack(data)
+
+
+# Group (machine_id, event_id) pairs into columnar batches for VendingFleet.apply_events
+def batched(events, size):
+    events = iter(events)
+    while True:
+        machine_ids = array("I")
+        event_ids = array("B")
+        for machine_id, event_id in itertools.islice(events, size):
+            machine_ids.append(machine_id)
+            event_ids.append(event_id)
+        if not machine_ids:
+            return
+        yield machine_ids, event_ids
+
+
+# Streams events through a VendingFleet and records throughput, state
+# occupancy and memory per machine. With snapshot_path set, the fleet
+# state and the number of events consumed are saved every snapshot_every
+# events, and a new simulator over the same path resumes from there.
+# Throughput counts only the events this simulator applied itself.
+class FleetSimulator:
+    def __init__(self, machines, engine=None, snapshot_path=None, snapshot_every=1_000_000, batch_size=65_536):
+        self.engine = engine or StateMachineEngine()
+        self.fleet = VendingFleet(self.engine, machines)
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self.batch_size = batch_size
+        self.processed = 0
+        self.processed_this_run = 0
+        self.elapsed = 0.0
+        if snapshot_path and os.path.exists(snapshot_path):
+            self._load_snapshot()
+
+    def run(self, events):
+        # Events already covered by the snapshot are skipped
+        events = itertools.islice(events, self.processed, None)
+        next_snapshot = self.processed + self.snapshot_every
+        for machine_ids, event_ids in batched(events, self.batch_size):
+            start = time.perf_counter()
+            self.fleet.apply_events(machine_ids, event_ids)
+            self.elapsed += time.perf_counter() - start
+            self.processed += len(event_ids)
+            self.processed_this_run += len(event_ids)
+            if self.snapshot_path and self.processed >= next_snapshot:
+                self.save_snapshot()
+                next_snapshot = self.processed + self.snapshot_every
+        if self.snapshot_path:
+            self.save_snapshot()
+        return self.report()
+
+    def save_snapshot(self):
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "wb") as snapshot:
+            snapshot.write(SNAPSHOT_HEADER.pack(self.processed, len(self.fleet.states)))
+            snapshot.write(self.fleet.states.tobytes())
+        os.replace(temp_path, self.snapshot_path)
+
+    def _load_snapshot(self):
+        with open(self.snapshot_path, "rb") as snapshot:
+            processed, machines = SNAPSHOT_HEADER.unpack(snapshot.read(SNAPSHOT_HEADER.size))
+            if machines != len(self.fleet.states):
+                raise ValueError(f"Snapshot holds {machines} machines, not {len(self.fleet.states)}")
+            states = array("B")
+            states.frombytes(snapshot.read())
+        self.fleet.states = states
+        self.processed = processed
+
+    def occupancy(self):
+        return {state.__name__: self.fleet.states.count(state_id) for state_id, state in enumerate(self.engine.states)}
+
+    def report(self):
+        return {
+            "events": self.processed,
+            "transitions_per_second": self.processed_this_run / self.elapsed if self.elapsed else 0.0,
+            "occupancy": self.occupancy(),
+            "bytes_per_machine": sys.getsizeof(self.fleet.states) / len(self.fleet.states),
+        }
+
+
+# Replays events through real VendingMachineContext objects and checks that
+# the compiled fleet ends in the same states; catches drift in the State classes
+def verify(events, machines):
+    events = list(events)
+    contexts = [VendingMachineContext() for _ in range(machines)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for machine_id, event_id in events:
+            getattr(contexts[machine_id], StateMachineEngine.EVENTS[event_id])()
+    simulator = FleetSimulator(machines)
+    simulator.run(events)
+    return all(type(context.state) is simulator.fleet.state_of(machine_id)
+               for machine_id, context in enumerate(contexts))
+
+
+if __name__ == "__main__":
+    machines = 100_000
+    print("State classes match compiled table:", verify(generate_events(1_000, 100_000), 1_000))
+
+    log_path = os.path.join(tempfile.mkdtemp(), "events.log")
+    write_event_log(log_path, generate_events(machines, 5_000_000))
+
+    simulator = FleetSimulator(machines, snapshot_path=log_path + ".snapshot")
+    report = simulator.run(read_event_log(log_path))
+    print(f"Events: {report['events']:,}")
+    print(f"Transitions/sec: {report['transitions_per_second']:,.0f}")
+    print(f"Bytes per machine: {report['bytes_per_machine']:.2f}")
+    for state, count in report["occupancy"].items():
+        print(f"  {state}: {count}")
@@ -6,7 +6,26 @@ In Python, you can implement the Visitor pattern using classes and method overri
 """
 
 
-# Define the Visitor interface
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _column_sum(prices):
+    if numpy is not None and prices:
+        return float(numpy.frombuffer(prices).sum())
+    return sum(prices)
+
+# Define the Visitor interface. Besides per-element visits, a visitor can
+# declare per-type kernels named visit_<kind>_prices that take a whole
+# column of prices at once; visit_columns() calls one kernel per type.
 class ShoppingCartVisitor:
     def visit_book(self, book):
         pass
@@ -17,6 +36,13 @@ class ShoppingCartVisitor:
     def visit_clothes(self, clothes):
         pass
 
+    def visit_columns(self, columns):
+        return self.reduce(getattr(self, f"visit_{kind}_prices")(prices) for kind, prices in columns.items())
+
+    # Combines per-element or per-shard results
+    def reduce(self, results):
+        return sum(results)
+
 # Concrete Visitor implementation for calculating total cost with tax
 class ShoppingCartTotalVisitor(ShoppingCartVisitor):
     def visit_book(self, book):
@@ -28,8 +54,19 @@ class ShoppingCartTotalVisitor(ShoppingCartVisitor):
     def visit_clothes(self, clothes):
         return clothes.price + (clothes.price * 0.08)  # 8% tax
 
+    def visit_book_prices(self, prices):
+        return _column_sum(prices) * 1.05
+
+    def visit_electronics_prices(self, prices):
+        return _column_sum(prices) * 1.10
+
+    def visit_clothes_prices(self, prices):
+        return _column_sum(prices) * 1.08
+
 # Define the elements (items) in the object structure
 class Book:
+    kind = "book"
+
     def __init__(self, title, price):
         self.title = title
         self.price = price
@@ -37,7 +74,13 @@ class Book:
     def accept(self, visitor):
         return visitor.visit_book(self)
 
+    # Pickle as constructor arguments rather than an instance __dict__
+    def __reduce__(self):
+        return (type(self), (self.title, self.price))
+
 class Electronics:
+    kind = "electronics"
+
     def __init__(self, name, price):
         self.name = name
         self.price = price
@@ -45,7 +88,13 @@ class Electronics:
     def accept(self, visitor):
         return visitor.visit_electronics(self)
 
+    # Pickle as constructor arguments rather than an instance __dict__
+    def __reduce__(self):
+        return (type(self), (self.name, self.price))
+
 class Clothes:
+    kind = "clothes"
+
     def __init__(self, type, price):
         self.type = type
         self.price = price
@@ -53,11 +102,81 @@ class Clothes:
     def accept(self, visitor):
         return visitor.visit_clothes(self)
 
-# Create a shopping cart
-cart = [Book("Python Programming", 50.0), Electronics("Laptop", 800.0), Clothes("T-shirt", 20.0)]
+    # Pickle as constructor arguments rather than an instance __dict__
+    def __reduce__(self):
+        return (type(self), (self.type, self.price))
+
+# Elements partitioned by type into array('d') price columns for bulk visits
+class ColumnarCart:
+    def __init__(self, elements=()):
+        self.columns = {}
+        for element in elements:
+            self.add(element)
 
-# Calculate the total cost with tax using the Visitor pattern
-total_cost_visitor = ShoppingCartTotalVisitor()
-total_cost = sum(item.accept(total_cost_visitor) for item in cart)
+    def add(self, element):
+        column = self.columns.get(element.kind)
+        if column is None:
+            column = self.columns[element.kind] = array("d")
+        column.append(element.price)
 
-print(f"Total cost with tax: ${total_cost:.2f}")
+    def accept(self, visitor):
+        return visitor.visit_columns(self.columns)
+
+def _visit_shard(visitor, shard):
+    return visitor.reduce(element.accept(visitor) for element in shard)
+
+# Split the elements into shards for a process pool: about four shards per
+# worker to balance load, but never so small that pickling dominates
+def _chunk_size(count, workers, min_chunk=10_000):
+    return max(min_chunk, math.ceil(count / (workers * 4)))
+
+# Visit elements across a process pool and combine shard results with visitor.reduce()
+def parallel_accept(elements, visitor, max_workers=None, chunk_size=None):
+    workers = max_workers or os.cpu_count() or 1
+    chunk_size = chunk_size or _chunk_size(len(elements), workers)
+    shards = [elements[start:start + chunk_size] for start in range(0, len(elements), chunk_size)]
+    if len(shards) <= 1:
+        return _visit_shard(visitor, elements)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        partials = executor.map(_visit_shard, [visitor] * len(shards), shards)
+        return visitor.reduce(partials)
+
+# Per-item and columnar totals over the same cart, with their timings
+def benchmark_columnar_total(items=3_000_000):
+    kinds = (Book, Electronics, Clothes)
+    elements = [kinds[i % 3](f"Item {i}", float(i % 500)) for i in range(items)]
+    visitor = ShoppingCartTotalVisitor()
+
+    start = time.perf_counter()
+    per_item = sum(element.accept(visitor) for element in elements)
+    per_item_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columnar_cart = ColumnarCart(elements)
+    partition_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columnar = columnar_cart.accept(visitor)
+    columnar_time = time.perf_counter() - start
+
+    assert math.isclose(per_item, columnar, rel_tol=1e-9)
+    return {"per item": per_item_time, "partition": partition_time, "columnar": columnar_time}
+
+if __name__ == "__main__":
+    # Create a shopping cart
+    cart = [Book("Python Programming", 50.0), Electronics("Laptop", 800.0), Clothes("T-shirt", 20.0)]
+
+    # Calculate the total cost with tax using the Visitor pattern
+    total_cost_visitor = ShoppingCartTotalVisitor()
+    total_cost = sum(item.accept(total_cost_visitor) for item in cart)
+
+    print(f"Total cost with tax: ${total_cost:.2f}")
+
+    large_cart = cart * 1_000_000
+    start = time.perf_counter()
+    parallel_total = parallel_accept(large_cart, total_cost_visitor)
+    print(f"Parallel total of {len(large_cart)} items: ${parallel_total:.2f} "
+          f"in {time.perf_counter() - start:.2f} s")
+
+    for name, elapsed in benchmark_columnar_total().items():
+        print(f"{name}: {elapsed * 1000:.1f} ms")
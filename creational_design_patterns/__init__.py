@@ -0,0 +1,29 @@
+"""
+Creational design patterns. Public classes are resolved lazily on first attribute access (PEP 562),
+so importing the package does not import, or run, any of the pattern modules.
+"""
+
+
+import importlib
+
+_EXPORTS = {
+    "factory_method": ("Pizza", "MargheritaPizza", "PepperoniPizza", "PizzaFactory"),
+    "prototype_method": ("MonsterPrototype", "MonsterBatch", "CowMonster", "PrototypeRegistry"),
+}
+
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
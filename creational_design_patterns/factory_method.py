@@ -4,8 +4,18 @@ for creating objects but allows subclasses to alter the type of objects that wil
 created. In Python, you can implement the Factory Design Pattern using classes and methods
 """
 
+from collections import deque
+import importlib
+import threading
+import time
+import tracemalloc
+
 # Define the Pizza base class
 class Pizza:
+    # Called before a pooled pizza is handed out again
+    def reset(self):
+        pass
+
     def prepare(self):
         pass
 
@@ -45,32 +55,101 @@ class PepperoniPizza(Pizza):
     def box(self):
         print("Boxing Pepperoni Pizza")
 
-# PizzaFactory to create different types of pizzas
+# PizzaFactory to create different types of pizzas. The registry maps a
+# pizza type to a class or to a dotted import path, which is imported the
+# first time that type is ordered. With pooled=True, pizzas handed back
+# through release() are reset and reused instead of garbage-collected.
 class PizzaFactory:
     pizzas = {
         "Margherita": MargheritaPizza,
         "Pepperoni": PepperoniPizza,
     }
+    _registry_lock = threading.Lock()
 
+    def __init__(self, pooled=False, pool_size=64):
+        self.pooled = pooled
+        self.pool_size = pool_size
+        self._pools = {}
+        self._pool_lock = threading.Lock()
 
-    def create_pizza(self, pizza_type):
+    @classmethod
+    def register(cls, pizza_type, pizza_class_or_path):
+        with cls._registry_lock:
+            cls.pizzas[pizza_type] = pizza_class_or_path
+
+    def _pizza_class(self, pizza_type):
         if not pizza_type in self.pizzas:
             raise ValueError("Invalid pizza type")
-        
-        return self.pizzas[pizza_type]()
+        pizza_class = self.pizzas[pizza_type]
+        if isinstance(pizza_class, str):
+            with self._registry_lock:
+                pizza_class = self.pizzas[pizza_type]
+                if isinstance(pizza_class, str):
+                    module_name, class_name = pizza_class.rsplit(".", 1)
+                    pizza_class = getattr(importlib.import_module(module_name), class_name)
+                    self.pizzas[pizza_type] = pizza_class
+        return pizza_class
+
+    def create_pizza(self, pizza_type):
+        return self.create_many(pizza_type, 1)[0]
+
+    def create_many(self, pizza_type, n):
+        pizza_class = self._pizza_class(pizza_type)
+        pizzas = []
+        if self.pooled:
+            with self._pool_lock:
+                pool = self._pools.get(pizza_type)
+                while pool and len(pizzas) < n:
+                    pizzas.append(pool.pop())
+        pizzas.extend(pizza_class() for _ in range(n - len(pizzas)))
+        return pizzas
+
+    def release(self, pizza, pizza_type):
+        if not self.pooled:
+            return
+        pizza.reset()
+        with self._pool_lock:
+            pool = self._pools.setdefault(pizza_type, deque())
+            if len(pool) < self.pool_size:
+                pool.append(pizza)
+
+
+def _order_cycle(factory, orders):
+    for _ in range(orders):
+        pizza = factory.create_pizza("Margherita")
+        factory.release(pizza, "Margherita")
+
+# Seconds per pizza and peak traced bytes, pooled versus unpooled. Memory is
+# measured in a separate run because tracing slows allocation down.
+def benchmark_pooling(orders=100_000):
+    results = {}
+    for pooled in (False, True):
+        start = time.perf_counter()
+        _order_cycle(PizzaFactory(pooled=pooled), orders)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        _order_cycle(PizzaFactory(pooled=pooled), orders)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results["pooled" if pooled else "unpooled"] = {"seconds_per_pizza": elapsed / orders, "peak_bytes": peak}
+    return results
 
 
 # Client code
-pizza_factory = PizzaFactory()
-
-pizza1 = pizza_factory.create_pizza("Margherita")
-pizza1.prepare()
-pizza1.bake()
-pizza1.cut()
-pizza1.box()
-
-pizza2 = pizza_factory.create_pizza("Pepperoni")
-pizza2.prepare()
-pizza2.bake()
-pizza2.cut()
-pizza2.box()
+if __name__ == "__main__":
+    pizza_factory = PizzaFactory()
+
+    pizza1 = pizza_factory.create_pizza("Margherita")
+    pizza1.prepare()
+    pizza1.bake()
+    pizza1.cut()
+    pizza1.box()
+
+    pizza2 = pizza_factory.create_pizza("Pepperoni")
+    pizza2.prepare()
+    pizza2.bake()
+    pizza2.cut()
+    pizza2.box()
+
+    for mode, stats in benchmark_pooling().items():
+        print(f"{mode}: {stats['seconds_per_pizza'] * 1e9:.0f} ns/pizza, peak {stats['peak_bytes']} bytes")
@@ -6,33 +6,227 @@ It helps in reducing the overhead of creating objects by cloning an existing ins
 """
 
 
+from array import array
 import copy
+import time
+import tracemalloc
+
+
+# Generates a clone() that copies each slot directly instead of walking the
+# object with copy.deepcopy. Fields listed in `mutable_fields` are still
+# deep-copied; everything else is immutable and shared by reference.
+# Subclasses without __slots__ keep an instance __dict__, which is copied
+# shallowly with the same treatment for its mutable fields.
+def _build_clone(cls):
+    fields = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        for field in (slots,) if isinstance(slots, str) else slots:
+            if field not in ("__dict__", "__weakref__") and field not in fields:
+                fields.append(field)
+    lines = ["def clone(self):", "    new = _new(_cls)"]
+    for field in fields:
+        if field in cls.mutable_fields:
+            lines.append(f"    new.{field} = _deepcopy(self.{field})")
+        else:
+            lines.append(f"    new.{field} = self.{field}")
+    if cls.__dictoffset__:
+        lines.append("    state = self.__dict__.copy()")
+        for field in cls.mutable_fields:
+            if field not in fields:
+                lines.append(f"    if {field!r} in state: state[{field!r}] = _deepcopy(state[{field!r}])")
+        lines.append("    new.__dict__.update(state)")
+    lines.append("    return new")
+    namespace = {"_new": object.__new__, "_cls": cls, "_deepcopy": copy.deepcopy}
+    exec("\n".join(lines), namespace)
+    return namespace["clone"]
 
 # Define a prototype class for a monster
 class MonsterPrototype:
+    __slots__ = ("name", "health", "damage")
+    mutable_fields = ()
+
     def __init__(self, name, health, damage):
         self.name = name
         self.health = health
         self.damage = damage
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "clone" not in cls.__dict__:
+            cls.clone = _build_clone(cls)
+
+    def clone_many(self, n, names=None):
+        return MonsterBatch.from_prototype(self, n, names)
+
+MonsterPrototype.clone = _build_clone(MonsterPrototype)
+
+# Struct-of-arrays batch of monsters: names are interned in `names` and
+# referenced by id, health and damage live in typed arrays
+class MonsterBatch:
+    def __init__(self, names=None):
+        self.names = names if names is not None else []
+        self.name_ids = array("I")
+        self.health = array("i")
+        self.damage = array("i")
+
+    @classmethod
+    def from_prototype(cls, prototype, n, names=None):
+        batch = cls(names)
+        if prototype.name in batch.names:
+            name_id = batch.names.index(prototype.name)
+        else:
+            name_id = len(batch.names)
+            batch.names.append(prototype.name)
+        batch.name_ids = array("I", [name_id]) * n
+        batch.health = array("i", [prototype.health]) * n
+        batch.damage = array("i", [prototype.damage]) * n
+        return batch
+
+    def __len__(self):
+        return len(self.health)
+
+    def monster(self, index):
+        return MonsterPrototype(self.names[self.name_ids[index]], self.health[index], self.damage[index])
+
+# Copy-on-write clone: reads fall through to the shared prototype until a
+# field is written, and then only the overridden fields are stored
+class CowMonster:
+    __slots__ = ("_prototype", "_overrides")
+
+    def __init__(self, prototype):
+        object.__setattr__(self, "_prototype", prototype)
+        object.__setattr__(self, "_overrides", None)
+
+    def __getattr__(self, field):
+        # Slots are unset on instances made by copy and pickle before
+        # __setstate__ runs; falling through would recurse
+        if field in ("_prototype", "_overrides"):
+            raise AttributeError(field)
+        overrides = self._overrides
+        if overrides is not None and field in overrides:
+            return overrides[field]
+        return getattr(self._prototype, field)
+
+    def __setattr__(self, field, value):
+        if self._overrides is None:
+            object.__setattr__(self, "_overrides", {})
+        self._overrides[field] = value
+
     def clone(self):
-        return copy.deepcopy(self)
-
-# Concrete monster prototypes
-goblin_prototype = MonsterPrototype("Goblin", 30, 5)
-orc_prototype = MonsterPrototype("Orc", 50, 10)
-skeleton_prototype = MonsterPrototype("Skeleton", 20, 3)
-
-# Create new monsters by cloning the prototypes
-monster1 = goblin_prototype.clone()
-monster2 = orc_prototype.clone()
-monster3 = skeleton_prototype.clone()
-
-# Modify the cloned monsters if needed
-monster1.name = "Red Goblin"
-monster2.health = 60
-
-# Print the details of the created monsters
-print(f"Monster 1: {monster1.name} (Health: {monster1.health}, Damage: {monster1.damage})")
-print(f"Monster 2: {monster2.name} (Health: {monster2.health}, Damage: {monster2.damage})")
-print(f"Monster 3: {monster3.name} (Health: {monster3.health}, Damage: {monster3.damage})")
+        twin = CowMonster(self._prototype)
+        if self._overrides:
+            object.__setattr__(twin, "_overrides", dict(self._overrides))
+        return twin
+
+    __copy__ = clone
+
+    def __getstate__(self):
+        return self._prototype, self._overrides
+
+    def __setstate__(self, state):
+        prototype, overrides = state
+        object.__setattr__(self, "_prototype", prototype)
+        object.__setattr__(self, "_overrides", overrides)
+
+    def materialize(self):
+        monster = self._prototype.clone()
+        for field, value in (self._overrides or {}).items():
+            setattr(monster, field, value)
+        return monster
+
+# Prototypes registered by name; spawn() hands out copy-on-write clones
+class PrototypeRegistry:
+    def __init__(self):
+        self._prototypes = {}
+
+    def register(self, name, prototype):
+        self._prototypes[name] = prototype
+
+    def unregister(self, name):
+        del self._prototypes[name]
+
+    def get(self, name):
+        return self._prototypes[name]
+
+    def spawn(self, name):
+        return CowMonster(self._prototypes[name])
+
+# Traced bytes per monster for n full clones versus n copy-on-write clones,
+# with and without one overridden field each
+def measure_clone_memory(n=1_000_000):
+    registry = PrototypeRegistry()
+    registry.register("goblin", MonsterPrototype("Goblin", 30, 5))
+    results = {}
+    for label, spawn in (
+        ("clone", lambda: registry.get("goblin").clone()),
+        ("copy-on-write", lambda: registry.spawn("goblin")),
+    ):
+        for override in (False, True):
+            tracemalloc.start()
+            monsters = [spawn() for _ in range(n)]
+            if override:
+                for monster in monsters:
+                    monster.health = 60
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del monsters
+            results[f"{label}{' + 1 write' if override else ''}"] = current / n
+    return results
+
+# Seconds per clone for copy.deepcopy, the generated clone() and clone_many()
+def benchmark_cloning(n=100_000):
+    prototype = MonsterPrototype("Goblin", 30, 5)
+    timings = {}
+
+    start = time.perf_counter()
+    for _ in range(n):
+        copy.deepcopy(prototype)
+    timings["deepcopy"] = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        prototype.clone()
+    timings["clone"] = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    prototype.clone_many(n)
+    timings["clone_many"] = (time.perf_counter() - start) / n
+    return timings
+
+# Client code
+if __name__ == "__main__":
+    # Concrete monster prototypes
+    goblin_prototype = MonsterPrototype("Goblin", 30, 5)
+    orc_prototype = MonsterPrototype("Orc", 50, 10)
+    skeleton_prototype = MonsterPrototype("Skeleton", 20, 3)
+
+    # Create new monsters by cloning the prototypes
+    monster1 = goblin_prototype.clone()
+    monster2 = orc_prototype.clone()
+    monster3 = skeleton_prototype.clone()
+
+    # Modify the cloned monsters if needed
+    monster1.name = "Red Goblin"
+    monster2.health = 60
+
+    # Print the details of the created monsters
+    print(f"Monster 1: {monster1.name} (Health: {monster1.health}, Damage: {monster1.damage})")
+    print(f"Monster 2: {monster2.name} (Health: {monster2.health}, Damage: {monster2.damage})")
+    print(f"Monster 3: {monster3.name} (Health: {monster3.health}, Damage: {monster3.damage})")
+
+    batch = goblin_prototype.clone_many(10_000)
+    print(f"Spawned {len(batch)} goblins; first is {batch.monster(0).name}")
+
+    for method, seconds in benchmark_cloning(10_000).items():
+        print(f"{method}: {seconds * 1e9:.0f} ns/monster")
+
+    registry = PrototypeRegistry()
+    registry.register("goblin", goblin_prototype)
+    registry.register("orc", orc_prototype)
+    elite_orc = registry.spawn("orc")
+    elite_orc.health = 60
+    print(f"Elite {elite_orc.name} (Health: {elite_orc.health}, Damage: {elite_orc.damage})")
+
+    for label, per_monster in measure_clone_memory(10_000).items():
+        print(f"{label}: {per_monster:.0f} bytes/monster")
@@ -0,0 +1,42 @@
+"""
+Import-time benchmark for the pattern packages. Each package is imported in a fresh interpreter
+with `-X importtime`, and its cumulative import cost is checked against a fixed budget.
+Packages resolve their classes lazily, so a cold import should cost almost nothing.
+
+    python import_time_benchmark.py
+"""
+
+
+import os
+import subprocess
+import sys
+
+PACKAGES = ("behavioral_design_patterns", "creational_design_patterns", "structural_design_patterns")
+BUDGET_US = 5_000
+
+
+# Cumulative microseconds spent importing `module` in a fresh interpreter
+def cold_import_time(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError(f"No import timing reported for {module}")
+
+
+if __name__ == "__main__":
+    over_budget = []
+    for package in PACKAGES:
+        cost = cold_import_time(package)
+        print(f"{package}: {cost} us (budget {BUDGET_US} us)")
+        if cost > BUDGET_US:
+            over_budget.append(package)
+    if over_budget:
+        sys.exit(f"Over import budget: {', '.join(over_budget)}")
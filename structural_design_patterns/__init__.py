@@ -0,0 +1,38 @@
+"""
+Structural design patterns. Public classes are resolved lazily on first attribute access (PEP 562),
+so importing the package does not import, or run, any of the pattern modules.
+"""
+
+
+import importlib
+
+_EXPORTS = {
+    "composite_method": (
+        "FileSystemComponent", "File", "Directory", "LazyDirectory", "build_tree", "save_snapshot",
+        "load_snapshot",
+    ),
+    "decorator_method": (
+        "Coffee", "SimpleCoffee", "CoffeeDecorator", "MilkDecorator", "SugarDecorator",
+        "VanillaDecorator",
+    ),
+    "facade_method": ("DVDPlayer", "AudioSystem", "Projector", "HomeTheaterFacade"),
+    "flyweight_method": ("CharacterStyle", "CharacterStyleFactory", "StyledTextBuffer", "TextEditor"),
+    "proxy_method": ("Image", "RealImage", "ProxyImage"),
+}
+
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
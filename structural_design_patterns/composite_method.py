@@ -6,46 +6,412 @@ and compositions of objects uniformly.
 
 
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
 
 # Component interface
 class FileSystemComponent(ABC):
+    parent = None
+
     @abstractmethod
     def display(self):
         pass
 
+    def walk(self):
+        yield self
+
+    @property
+    def path(self):
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return "/".join(reversed(names))
+
 # Leaf class
 class File(FileSystemComponent):
-    def __init__(self, name):
+    def __init__(self, name, size=0):
         self.name = name
+        self.size = size
+
+    @property
+    def file_count(self):
+        return 1
+
+    @property
+    def total_size(self):
+        return self.size
 
     def display(self):
         print(f"File: {self.name}")
 
-# Composite class
+# Bookkeeping shared by every directory of one tree: its root and its
+# path -> node index, built on the first find(). When a tree is added
+# into another, its _Tree forwards to the new one, so nodes never need
+# updating on merge.
+class _Tree:
+    __slots__ = ("root", "index", "merged_into")
+
+    def __init__(self, root):
+        self.root = root
+        self.index = None
+        self.merged_into = None
+
+# (relative path, node) pairs for a subtree, without recursion
+def _relative_paths(component):
+    stack = [(component.name, component)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node
+        if isinstance(node, Directory):
+            for child in reversed(node.children.values()):
+                stack.append((path + "/" + child.name, child))
+
+# Composite class. Children are keyed by name. Each directory caches the
+# file count and total size of its subtree. Files directly inside a
+# directory are counted on add/remove; a change marks the directory and
+# its ancestors dirty, stopping at the first one that is already dirty,
+# and a dirty aggregate is recomputed from the subdirectories on read.
 class Directory(FileSystemComponent):
     def __init__(self, name):
         self.name = name
-        self.children = []
+        self.children = {}
+        self._subdirectories = {}
+        self._own_files = 0
+        self._own_size = 0
+        self._file_count = 0
+        self._total_size = 0
+        self._dirty = False
+        self._tree = _Tree(self)
+
+    def _resolve_tree(self):
+        tree = self._tree
+        while tree.merged_into is not None:
+            tree = tree.merged_into
+        # Path compression keeps later lookups short
+        step = self._tree
+        while step is not tree:
+            step.merged_into, step = tree, step.merged_into
+        self._tree = tree
+        return tree
+
+    @property
+    def root(self):
+        return self._resolve_tree().root
 
     def add(self, component):
-        self.children.append(component)
+        if component.name in self.children:
+            raise ValueError(f"{self.path} already contains {component.name}")
+        if component.parent is not None:
+            component.parent.remove(component)
+        self.children[component.name] = component
+        component.parent = self
+        if isinstance(component, Directory):
+            self._subdirectories[component.name] = component
+            component._resolve_tree().merged_into = self._resolve_tree()
+        else:
+            self._own_files += 1
+            self._own_size += component.size
+        self._invalidate()
+        index = self._resolve_tree().index
+        if index is not None:
+            prefix = self.path + "/"
+            for path, node in _relative_paths(component):
+                index[prefix + path] = node
 
     def remove(self, component):
-        self.children.remove(component)
+        if self.children.get(component.name) is not component:
+            raise ValueError(f"{component.name} is not in {self.path}")
+        index = self._resolve_tree().index
+        if index is not None:
+            prefix = self.path + "/"
+            for path, node in _relative_paths(component):
+                del index[prefix + path]
+        del self.children[component.name]
+        component.parent = None
+        if isinstance(component, Directory):
+            del self._subdirectories[component.name]
+            tree = _Tree(component)
+            for node in component.walk():
+                if isinstance(node, Directory):
+                    node._tree = tree
+        else:
+            self._own_files -= 1
+            self._own_size -= component.size
+        self._invalidate()
+
+    def _invalidate(self):
+        node = self
+        while node is not None and not node._dirty:
+            node._dirty = True
+            node = node.parent
+
+    def _refresh(self):
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                subdirectories = node._subdirectories.values()
+                node._file_count = node._own_files + sum(d._file_count for d in subdirectories)
+                node._total_size = node._own_size + sum(d._total_size for d in subdirectories)
+                node._dirty = False
+            else:
+                stack.append((node, True))
+                stack.extend((d, False) for d in node._subdirectories.values() if d._dirty)
+
+    @property
+    def file_count(self):
+        if self._dirty:
+            self._refresh()
+        return self._file_count
+
+    @property
+    def total_size(self):
+        if self._dirty:
+            self._refresh()
+        return self._total_size
+
+    # O(1) lookup of a path such as "Root/Folder 1/File 1". The index is
+    # built on first use and kept up to date by add() and remove().
+    def find(self, path):
+        tree = self._resolve_tree()
+        if tree.index is None:
+            tree.index = dict(_relative_paths(tree.root))
+        return tree.index.get(path)
+
+    # Pre-order traversal with an explicit stack, so depth is not limited
+    # by the recursion limit
+    def walk(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if isinstance(node, Directory):
+                stack.extend(reversed(node.children.values()))
 
     def display(self):
-        print(f"Directory: {self.name}")
-        for child in self.children:
-            child.display()
+        for node in self.walk():
+            if isinstance(node, Directory):
+                print(f"Directory: {node.name}")
+            else:
+                node.display()
+
+# Directory whose children come from `loader` the first time they are
+# needed: listing, adding, traversal or reading an aggregate. Until then
+# it counts as dirty, so a parent's aggregates never use unloaded data.
+class LazyDirectory(Directory):
+    def __init__(self, name, loader):
+        self._loader = loader
+        super().__init__(name)
+        self._dirty = True
+
+    def _load(self):
+        loader, self._loader = self._loader, None
+        for component in loader():
+            self.add(component)
+
+    @property
+    def children(self):
+        if self._loader is not None:
+            self._load()
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+
+    @property
+    def _subdirectories(self):
+        if self._loader is not None:
+            self._load()
+        return self._subdirs
+
+    @_subdirectories.setter
+    def _subdirectories(self, subdirectories):
+        self._subdirs = subdirectories
+
+
+# (name, path, is_dir, size) for each entry of one directory on disk
+def _scan(os_path):
+    entries = []
+    try:
+        with os.scandir(os_path) as iterator:
+            for entry in iterator:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    size = 0 if is_dir else entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                entries.append((entry.name, entry.path, is_dir, size))
+    except OSError:
+        pass
+    return entries
+
+def _load_from_disk(os_path):
+    for name, path, is_dir, size in _scan(os_path):
+        yield LazyDirectory(name, partial(_load_from_disk, path)) if is_dir else File(name, size)
+
+# Scans directories on a thread pool; nodes are created on the calling
+# thread as each scan completes
+def _parallel_scan(os_path, max_workers):
+    root = Directory(os.path.basename(os.path.abspath(os_path)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_scan, os_path): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory = pending.pop(future)
+                for name, path, is_dir, size in future.result():
+                    if is_dir:
+                        child = Directory(name)
+                        pending[executor.submit(_scan, path)] = child
+                    else:
+                        child = File(name, size)
+                    directory.add(child)
+    return root
+
+
+# Snapshot file: a header, the absolute path of the scanned directory,
+# then one fixed-size record per node in breadth-first order, then the
+# UTF-8 names. The header also holds the directory's mtime at scan time so
+# a stale snapshot can be detected. A directory's children are contiguous
+# records, so any directory can be expanded on its own.
+SNAPSHOT_MAGIC = b"FSN2"
+SNAPSHOT_HEADER = struct.Struct("<4sIQqH")
+SNAPSHOT_RECORD = struct.Struct("<BHIIQQ")
+
+def save_snapshot(root, path, source_path, source_mtime_ns=None):
+    source = os.path.abspath(source_path).encode("utf-8", "surrogateescape")
+    if source_mtime_ns is None:
+        source_mtime_ns = os.stat(source_path).st_mtime_ns
+    records = bytearray()
+    names = bytearray()
+    queue = deque([root])
+    next_index = 1
+    while queue:
+        node = queue.popleft()
+        name = node.name.encode("utf-8", "surrogateescape")
+        if isinstance(node, Directory):
+            children = list(node.children.values())
+            records += SNAPSHOT_RECORD.pack(1, len(name), next_index, len(children), len(names), 0)
+            next_index += len(children)
+            queue.extend(children)
+        else:
+            records += SNAPSHOT_RECORD.pack(0, len(name), 0, 0, len(names), node.size)
+        names += name
+    count = len(records) // SNAPSHOT_RECORD.size
+    names_offset = SNAPSHOT_HEADER.size + len(source) + len(records)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as snapshot:
+        snapshot.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, count, names_offset, source_mtime_ns, len(source)))
+        snapshot.write(source)
+        snapshot.write(records)
+        snapshot.write(names)
+    os.replace(temp_path, path)
+
+class _SnapshotView:
+    def __init__(self, path):
+        with open(path, "rb") as snapshot:
+            self._data = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._data) < SNAPSHOT_HEADER.size:
+            raise ValueError(f"{path} is not a file-system snapshot")
+        magic, self.count, self._names_offset, self.source_mtime_ns, source_size = (
+            SNAPSHOT_HEADER.unpack_from(self._data))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a file-system snapshot")
+        self.source = self._data[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + source_size].decode(
+            "utf-8", "surrogateescape")
+        self._records_offset = SNAPSHOT_HEADER.size + source_size
+
+    def node(self, index):
+        kind, name_size, first_child, child_count, name_offset, size = SNAPSHOT_RECORD.unpack_from(
+            self._data, self._records_offset + index * SNAPSHOT_RECORD.size)
+        start = self._names_offset + name_offset
+        name = self._data[start:start + name_size].decode("utf-8", "surrogateescape")
+        if kind:
+            return LazyDirectory(name, partial(self.children, first_child, child_count))
+        return File(name, size)
+
+    def children(self, first_child, child_count):
+        for index in range(first_child, first_child + child_count):
+            yield self.node(index)
+
+def load_snapshot(path):
+    return _SnapshotView(path).node(0)
+
+# Builds Directory/File nodes mirroring os_path. By default the whole tree
+# is scanned up front on a thread pool; with lazy=True each directory is
+# scanned when first accessed. With snapshot_path set, a snapshot taken
+# from the same directory with the same mtime is memory-mapped and
+# expanded lazily instead of touching the disk tree; otherwise the tree is
+# rescanned and saved there for next time. Only the top directory's mtime
+# is compared, so changes deeper down go unnoticed. Saving needs the whole
+# tree, so lazy=True cannot be combined with snapshot_path.
+def build_tree(os_path, lazy=False, max_workers=8, snapshot_path=None):
+    if lazy and snapshot_path:
+        raise ValueError("lazy=True cannot be combined with snapshot_path")
+    if snapshot_path:
+        mtime_ns = os.stat(os_path).st_mtime_ns
+        if os.path.exists(snapshot_path):
+            try:
+                view = _SnapshotView(snapshot_path)
+            except ValueError:
+                view = None
+            if view and view.source == os.path.abspath(os_path) and view.source_mtime_ns == mtime_ns:
+                return view.node(0)
+    if lazy:
+        root = LazyDirectory(os.path.basename(os.path.abspath(os_path)), partial(_load_from_disk, os_path))
+    else:
+        root = _parallel_scan(os_path, max_workers)
+    if snapshot_path:
+        save_snapshot(root, snapshot_path, os_path, mtime_ns)
+    return root
+
+# Seconds to scan a generated tree of `files` files, save its snapshot and
+# reload it from the snapshot, each fully expanded
+def benchmark_tree_builder(files=1_000_000, files_per_directory=1_000):
+    workspace = tempfile.mkdtemp()
+    tree_path = os.path.join(workspace, "tree")
+    for directory_index in range(0, files, files_per_directory):
+        directory = os.path.join(tree_path, f"dir{directory_index // files_per_directory}")
+        os.makedirs(directory)
+        for file_index in range(min(files_per_directory, files - directory_index)):
+            open(os.path.join(directory, f"file{file_index}"), "wb").close()
+    snapshot_path = os.path.join(workspace, "tree.snapshot")
+    timings = {}
+    try:
+        start = time.perf_counter()
+        root = build_tree(tree_path)
+        timings["parallel scan"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        save_snapshot(root, snapshot_path, tree_path)
+        timings["save snapshot"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = build_tree(tree_path, snapshot_path=snapshot_path)
+        assert loaded.file_count == root.file_count == files
+        timings["load snapshot"] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workspace)
+    return timings
 
 # Client code
 if __name__ == "__main__":
     root = Directory("Root")
     folder1 = Directory("Folder 1")
     folder2 = Directory("Folder 2")
-    file1 = File("File 1")
-    file2 = File("File 2")
-    file3 = File("File 3")
+    file1 = File("File 1", 120)
+    file2 = File("File 2", 300)
+    file3 = File("File 3", 80)
 
     root.add(folder1)
     root.add(folder2)
@@ -55,3 +421,9 @@ if __name__ == "__main__":
 
     print("Displaying the file system hierarchy:")
     root.display()
+
+    print(f"\n{root.file_count} files, {root.total_size} bytes")
+    print("Lookup:", root.find("Root/Folder 2/File 3").name)
+
+    for step, seconds in benchmark_tree_builder(files=20_000).items():
+        print(f"{step}: {seconds:.2f} s")
@@ -7,45 +7,411 @@ but the cost of creating and maintaining each object individually would be high.
 """
 
 
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+import sys
+import threading
+import tracemalloc
+import weakref
+
+
 class CharacterStyle:
+    __slots__ = ("font_family", "font_size", "bold", "italic", "style", "__weakref__")
+
     def __init__(self, font_family, font_size, bold=False, italic=False):
         self.font_family = font_family
         self.font_size = font_size
         self.bold = bold
         self.italic = italic
-
-    def render(self, text):
         style = ""
-        if self.bold:
+        if bold:
             style += "bold "
-        if self.italic:
+        if italic:
             style += "italic "
-        style += f"{self.font_size}px {self.font_family}"
-        print(f"Rendering '{text}' in style: {style}")
+        self.style = style + f"{font_size}px {font_family}"
+
+    def render(self, text):
+        print(f"Rendering '{text}' in style: {self.style}")
 
 
+# Thread-safe interning pool. Lookups that hit take no lock; a miss locks
+# one of `stripes` locks chosen by key, so only misses on the same stripe
+# wait on each other. With max_size set, the pool keeps strong references
+# to at most max_size recently used styles. Recency is striped the same
+# way: each stripe is its own small LRU with its own lock and a share of
+# max_size, so hits on different stripes never contend and eviction is
+# least-recently-used per stripe rather than across the whole pool. An
+# evicted style stays interned, and is never duplicated, for as long as a
+# document still references it; after that it is garbage-collected. The
+# hit/miss/eviction counters are best-effort under concurrency.
 class CharacterStyleFactory:
-    _styles = {}
+    def __init__(self, max_size=None, stripes=16):
+        self.max_size = max_size
+        self._styles = {} if max_size is None else weakref.WeakValueDictionary()
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        lru_stripes = min(stripes, max_size) if max_size else 1
+        share, extra = divmod(max_size or 0, lru_stripes)
+        self._recent = [OrderedDict() for _ in range(lru_stripes)]
+        self._recent_locks = [threading.Lock() for _ in range(lru_stripes)]
+        self._recent_limits = [share + (index < extra) for index in range(lru_stripes)]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def get_style(self, font_family, font_size, bold=False, italic=False):
         key = (font_family, font_size, bold, italic)
-        if key not in self._styles:
-            self._styles[key] = CharacterStyle(font_family, font_size, bold, italic)
-        return self._styles[key]
+        style = self._styles.get(key)
+        if style is not None:
+            self.hits += 1
+        else:
+            with self._locks[hash(key) % len(self._locks)]:
+                style = self._styles.get(key)
+                if style is None:
+                    style = CharacterStyle(font_family, font_size, bold, italic)
+                    self._styles[key] = style
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        if self.max_size is not None:
+            self._touch(key, style)
+        return style
+
+    def _touch(self, key, style):
+        stripe = hash(key) % len(self._recent)
+        recent = self._recent[stripe]
+        with self._recent_locks[stripe]:
+            if key in recent:
+                recent.move_to_end(key)
+                return
+            recent[key] = style
+            if len(recent) > self._recent_limits[stripe]:
+                recent.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {"size": len(self._styles), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# One block of pieces in a StyledTextBuffer, as parallel arrays: byte
+# start and size in the text buffer, length in characters, and style id
+class _PieceBlock:
+    __slots__ = ("starts", "sizes", "lengths", "style_ids", "chars")
+
+    def __init__(self):
+        self.starts = array("Q")
+        self.sizes = array("I")
+        self.lengths = array("I")
+        self.style_ids = array("H")
+        self.chars = 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def insert(self, index, start, size, length, style_id):
+        self.starts.insert(index, start)
+        self.sizes.insert(index, size)
+        self.lengths.insert(index, length)
+        self.style_ids.insert(index, style_id)
+        self.chars += length
+
+    def remove(self, index):
+        self.chars -= self.lengths[index]
+        del self.starts[index], self.sizes[index], self.lengths[index], self.style_ids[index]
+
+    def split_off(self, index):
+        tail = _PieceBlock()
+        tail.starts, self.starts = self.starts[index:], self.starts[:index]
+        tail.sizes, self.sizes = self.sizes[index:], self.sizes[:index]
+        tail.lengths, self.lengths = self.lengths[index:], self.lengths[:index]
+        tail.style_ids, self.style_ids = self.style_ids[index:], self.style_ids[:index]
+        tail.chars = sum(tail.lengths)
+        self.chars -= tail.chars
+        return tail
+
+
+# Piece table for styled text. Text lives in one append-only UTF-8
+# bytearray; each piece points into it and carries a style id, so styles
+# cost two bytes per run instead of a pointer per tuple. Appending text in
+# the style of the previous run extends that run. Pieces are kept in
+# blocks of at most 2 * BLOCK_SIZE. A Fenwick tree over the blocks'
+# character counts finds the block holding an offset in O(log n), and a
+# bisect over that block's piece lengths finds the piece, so an edit then
+# shifts the arrays of a single block. Splitting a block rebuilds the tree,
+# which happens once per BLOCK_SIZE inserts into it; blocks emptied by
+# deletes are dropped in bulk once they make up half the list.
+class StyledTextBuffer:
+    BLOCK_SIZE = 512
+    MAX_PIECE = 1 << 16
+
+    def __init__(self):
+        self._data = bytearray()
+        self._styles = []
+        self._style_ids = {}
+        self._blocks = [_PieceBlock()]
+        self._tree = [0, 0]
+        self._empty_blocks = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def _style_id(self, style):
+        style_id = self._style_ids.get(id(style))
+        if style_id is None:
+            if len(self._styles) > 0xFFFF:
+                raise OverflowError("Too many distinct styles")
+            style_id = self._style_ids[id(style)] = len(self._styles)
+            self._styles.append(style)
+        return style_id
+
+    def _store(self, text):
+        start = len(self._data)
+        self._data += text.encode()
+        return start, len(self._data) - start
+
+    def _byte_offset(self, start, size, length, chars):
+        if size == length:
+            return chars
+        return len(self._data[start:start + size].decode()[:chars].encode())
+
+    def append(self, text, style):
+        if not text:
+            return
+        style_id = self._style_id(style)
+        start, size = self._store(text)
+        block = self._blocks[-1]
+        last = len(block) - 1
+        if (last >= 0 and block.style_ids[last] == style_id
+                and block.starts[last] + block.sizes[last] == start
+                and block.lengths[last] + len(text) <= self.MAX_PIECE):
+            block.sizes[last] += size
+            block.lengths[last] += len(text)
+            block.chars += len(text)
+        else:
+            if len(block) >= self.BLOCK_SIZE:
+                block = _PieceBlock()
+                self._blocks.append(block)
+                self._grow_tree()
+            block.insert(len(block), start, size, len(text), style_id)
+        self._add_chars(len(self._blocks) - 1, len(text))
+        self.length += len(text)
+
+    # Fenwick tree over block character counts, 1-based; tree[i] covers
+    # blocks i - (i & -i) .. i - 1
+    def _rebuild_tree(self):
+        tree = [0] + [block.chars for block in self._blocks]
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    # Extends the tree for a block just appended to the list
+    def _grow_tree(self):
+        tree = self._tree
+        index = len(tree)
+        total = self._blocks[-1].chars
+        covered = index - 1
+        while covered > index - (index & -index):
+            total += tree[covered]
+            covered -= covered & -covered
+        tree.append(total)
+
+    def _add_chars(self, block_index, delta):
+        tree = self._tree
+        index = block_index + 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    # Block index, piece index and character offset inside the piece holding `offset`
+    def _locate(self, offset):
+        if not 0 <= offset < self.length:
+            raise IndexError("offset out of range")
+        tree = self._tree
+        position = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if position + step < len(tree) and tree[position + step] <= offset:
+                position += step
+                offset -= tree[position]
+            step >>= 1
+        block = self._blocks[position]
+        prefix = list(accumulate(block.lengths))
+        piece_index = bisect_right(prefix, offset)
+        if piece_index:
+            offset -= prefix[piece_index - 1]
+        return position, piece_index, offset
+
+    def _split(self, block, index, chars):
+        start, size, length = block.starts[index], block.sizes[index], block.lengths[index]
+        head = self._byte_offset(start, size, length, chars)
+        block.sizes[index] = head
+        block.lengths[index] = chars
+        block.chars -= length - chars
+        block.insert(index + 1, start + head, size - head, length - chars, block.style_ids[index])
+
+    def insert(self, offset, text, style):
+        if not 0 <= offset <= self.length:
+            raise IndexError("offset out of range")
+        if offset == self.length:
+            self.append(text, style)
+            return
+        if not text:
+            return
+        block_index, index, within = self._locate(offset)
+        block = self._blocks[block_index]
+        if within:
+            self._split(block, index, within)
+            index += 1
+        start, size = self._store(text)
+        block.insert(index, start, size, len(text), self._style_id(style))
+        self._add_chars(block_index, len(text))
+        self.length += len(text)
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._blocks.insert(block_index + 1, block.split_off(self.BLOCK_SIZE))
+            self._rebuild_tree()
+
+    def delete(self, offset, count):
+        if offset < 0 or count < 0 or offset + count > self.length:
+            raise IndexError("range out of bounds")
+        while count:
+            block_index, index, within = self._locate(offset)
+            block = self._blocks[block_index]
+            if within:
+                self._split(block, index, within)
+                continue
+            length = block.lengths[index]
+            if count >= length:
+                block.remove(index)
+                if not len(block):
+                    self._empty_blocks += 1
+                taken = length
+            else:
+                head = self._byte_offset(block.starts[index], block.sizes[index], length, count)
+                block.starts[index] += head
+                block.sizes[index] -= head
+                block.lengths[index] -= count
+                block.chars -= count
+                taken = count
+            self._add_chars(block_index, -taken)
+            self.length -= taken
+            count -= taken
+        # Empty blocks hold no characters, so searches skip them until then
+        if self._empty_blocks > len(self._blocks) // 2:
+            self._blocks = [block for block in self._blocks if len(block)] or [_PieceBlock()]
+            self._empty_blocks = 0
+            self._rebuild_tree()
+
+    def runs(self):
+        data = self._data
+        styles = self._styles
+        for block in self._blocks:
+            for start, size, style_id in zip(block.starts, block.sizes, block.style_ids):
+                yield data[start:start + size].decode(), styles[style_id]
+
+    # Like runs(), but consecutive pieces sharing a style come out as one run
+    def coalesced_runs(self):
+        data = self._data
+        styles = self._styles
+        current_id = None
+        parts = []
+        for block in self._blocks:
+            for start, size, style_id in zip(block.starts, block.sizes, block.style_ids):
+                if style_id != current_id and parts:
+                    yield b"".join(parts).decode(), styles[current_id]
+                    parts = []
+                current_id = style_id
+                parts.append(data[start:start + size])
+        if parts:
+            yield b"".join(parts).decode(), styles[current_id]
+
+    def text(self):
+        return "".join(text for text, _ in self.runs())
 
 
 class TextEditor:
     def __init__(self, character_style_factory):
         self.character_style_factory = character_style_factory
-        self.characters = []
+        self.buffer = StyledTextBuffer()
+
+    # The stored runs as (text, style) pairs
+    @property
+    def characters(self):
+        return list(self.buffer.runs())
 
     def add_character(self, text, font_family, font_size, bold=False, italic=False):
         style = self.character_style_factory.get_style(font_family, font_size, bold, italic)
-        self.characters.append((text, style))
+        self.buffer.append(text, style)
 
-    def render_text(self):
-        for text, style in self.characters:
-            style.render(text)
+    def insert_text(self, offset, text, font_family, font_size, bold=False, italic=False):
+        style = self.character_style_factory.get_style(font_family, font_size, bold, italic)
+        self.buffer.insert(offset, text, style)
+
+    def delete_text(self, offset, count):
+        self.buffer.delete(offset, count)
+
+    # Rendered lines, one per run of a single style; each style is formatted once
+    def iter_render(self):
+        suffixes = {}
+        for text, style in self.buffer.coalesced_runs():
+            suffix = suffixes.get(style)
+            if suffix is None:
+                suffix = suffixes[style] = f"' in style: {style.style}\n"
+            yield "Rendering '" + text + suffix
+
+    # Writes to `out` (stdout by default) in chunks of about buffer_size characters
+    def render_text(self, out=None, buffer_size=1 << 16):
+        out = out or sys.stdout
+        pending = []
+        pending_size = 0
+        for line in self.iter_render():
+            pending.append(line)
+            pending_size += len(line)
+            if pending_size >= buffer_size:
+                out.write("".join(pending))
+                pending = []
+                pending_size = 0
+        if pending:
+            out.write("".join(pending))
+
+
+# Traced bytes per character for a generated document of `megabytes` of
+# text, stored as a list of (text, style) tuples and as a StyledTextBuffer
+def measure_memory_per_character(megabytes=100):
+    factory = CharacterStyleFactory()
+    styles = [factory.get_style("Arial", 12), factory.get_style("Arial", 12, bold=True),
+              factory.get_style("Times New Roman", 14, italic=True)]
+    words = ["lorem ", "ipsum ", "dolor ", "sit ", "amet, ", "consectetur "]
+    target = megabytes * 1_000_000
+
+    def document():
+        produced = 0
+        index = 0
+        while produced < target:
+            text = words[index % len(words)]
+            # The style changes every 8 words
+            yield text, styles[(index // 8) % len(styles)]
+            produced += len(text)
+            index += 1
+
+    results = {}
+    tracemalloc.start()
+    characters = [(text, style) for text, style in document()]
+    results["list of tuples"] = tracemalloc.get_traced_memory()[0] / target
+    del characters
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    buffer = StyledTextBuffer()
+    for text, style in document():
+        buffer.append(text, style)
+    results["StyledTextBuffer"] = tracemalloc.get_traced_memory()[0] / target
+    del buffer
+    tracemalloc.stop()
+    return results
 
 
 if __name__ == "__main__":
@@ -57,3 +423,11 @@ if __name__ == "__main__":
     editor.add_character("World!", "Arial", 12, True, True)
 
     editor.render_text()
+    print(style_factory.stats())
+
+    editor.insert_text(5, ",", "Arial", 12, True, False)
+    editor.delete_text(6, 1)
+    editor.render_text()
+
+    for storage, per_character in measure_memory_per_character(2).items():
+        print(f"{storage}: {per_character:.2f} bytes/character")